@@ -29,6 +29,7 @@ FONT = 'monospace'
 APPEAR_ANIMATION = (.72, .82, .9, .96, 1)
 MERGE_ANIMATION = (1, 1.03, 1.04, 1.03, 1)
 SLIDE_ANIMATION = (.29, .53, .72, .86, .95, .99, 1)
+CLOCK = kq2animation.Clock()
 UP = 1
 DOWN = 2
 LEFT = 3
@@ -84,13 +85,7 @@ class Game(kq2grid.Grid, kq2gui.Game):
         Initialize a 2048 game board.
         """
         kq2grid.Grid.__init__(self, rows, cols)
-
-        self.init_cells = {
-            UP: self.get_row(0),
-            DOWN: self.get_row(rows - 1),
-            LEFT: self.get_col(0),
-            RIGHT: self.get_col(cols - 1)
-        }
+        self.set_hash_key(Tile.get_val)
 
         self.num_tile = 0
         self.moved = False
@@ -126,9 +121,9 @@ class Game(kq2grid.Grid, kq2gui.Game):
         """
         Randomly add a new tile onto board.
         """
-        empty_cells = self.empty_cells()
-        if empty_cells:
-            row, col = random.choice(empty_cells)
+        cell = self.random_empty_cell()
+        if cell:
+            row, col = cell
             val = 2 if random.random() < .9 else 4
             tile = Tile(row, col, val)
             self.set_tile(row, col, tile)
@@ -137,17 +132,6 @@ class Game(kq2grid.Grid, kq2gui.Game):
             self.animation.new_tile(tile)
             print self
 
-    def get_line(self, init_cell, offset):
-        """
-        Return a line of cells.
-        """
-        ans = []
-        cell = init_cell
-        while self.is_valid(*cell):
-            ans.append(cell)
-            cell = kq2tile.add(cell, offset)
-        return ans
-
     def move(self, direction):
         """
         Move (merge) all tiles to one direction.
@@ -156,34 +140,35 @@ class Game(kq2grid.Grid, kq2gui.Game):
             return
 
         self.moved = False
-        for init_cell in self.init_cells[direction]:
-            self.merge(self.get_line(init_cell, OFFSETS[direction]))
+        for line in self.get_index_lines(OFFSETS[direction]):
+            self.merge(line)
         if self.moved:
             self.new_tile()
 
-    def merge(self, cells):
+    def merge(self, indices):
         """
-        Merge one line of tiles, front to back.
+        Merge one line of tiles, front to back, given as flat indices.
         Main game logic.
         """
-        tiles = self.pop_tiles(cells)
+        tiles = self.pop_index_tiles(indices)
         idx = 0
         for tile in tiles:
-            row, col = cells[idx]
-            prev_tile = self.get_tile(row, col)
+            index = indices[idx]
+            prev_tile = self.get_index_tile(index)
             if not prev_tile:
-                self.set_tile(row, col, tile)
+                self.set_index_tile(index, tile)
             elif prev_tile == tile:
                 new_tile = prev_tile + tile
-                self.set_tile(row, col, new_tile)
+                self.set_index_tile(index, new_tile)
                 self.animation.merge(prev_tile, tile, new_tile)
                 idx += 1
             else:
                 idx += 1
-                row, col = cells[idx]
-                self.set_tile(row, col, tile)
+                index = indices[idx]
+                self.set_index_tile(index, tile)
 
-            if (row, col) != tile.get_cell():
+            if index != self.get_index(tile.get_row(), tile.get_col()):
+                row, col = self.get_cell(index)
                 self.animation.move_tile(row, col, tile)
                 tile.set_cell(row, col)
                 self.moved = True
@@ -233,6 +218,7 @@ class AnimationManager:
 
         mix_ani.add_animation(size_ani)
         mix_ani.add_animation(move_ani)
+        mix_ani.set_clock(CLOCK)
         tile.set_animation(mix_ani)
         self.hiding_tiles.add(tile)
 
@@ -2,6 +2,15 @@
 Animations
 """
 import math
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+FRAME_TIME = 1.0 / 60
+FLIP_TABLES = {}
 
 
 def slices(start, end, ratios):
@@ -20,6 +29,21 @@ def list_slices(start_list, end_list, ratios):
                  for start, end in zip(start_list, end_list)))
 
 
+def slice_at(start, end, ratio):
+    """
+    Return one slice at given ratio.
+    """
+    return start + (end - start) * ratio
+
+
+def list_slice_at(start_list, end_list, ratio):
+    """
+    Return one sliced list at given ratio.
+    """
+    return tuple(start + (end - start) * ratio
+                 for start, end in zip(start_list, end_list))
+
+
 def list_add(list1, list2):
     """
     Return a list of sums of elements.
@@ -35,42 +59,211 @@ def oval_pos(size, center, angle):
             center[1] + math.sin(angle) * size[1] / 2)
 
 
+def flip_front(angle):
+    """
+    Return true if front side is facing up at given flip angle.
+    """
+    return 0 <= (angle + math.pi / 2) % (2 * math.pi) < math.pi
+
+
+def x_flip_offsets(size, angle, visual_diff=4):
+    """
+    Return the corners of a horizontally flipping rectangle centered
+    at origin, each as an edge center and an offset from it.
+    """
+    upper_center = (0, -size[1] / 2.0)
+    lower_center = (0, size[1] / 2.0)
+    size = (size[0], visual_diff)
+    origin = (0, 0)
+    return [(upper_center, oval_pos(size, origin, angle + math.pi)),
+            (upper_center, oval_pos(size, origin, angle)),
+            (lower_center, oval_pos(size, origin, -angle)),
+            (lower_center, oval_pos(size, origin, -angle + math.pi))]
+
+
+def y_flip_offsets(size, angle, visual_diff=4):
+    """
+    Return the corners of a vertically flipping rectangle centered
+    at origin, each as an edge center and an offset from it.
+    """
+    left_center = (-size[0] / 2.0, 0)
+    right_center = (size[0] / 2.0, 0)
+    size = (visual_diff, size[1])
+    origin = (0, 0)
+    return [(left_center, oval_pos(size, origin, angle + math.pi / 2)),
+            (left_center, oval_pos(size, origin, angle - math.pi / 2)),
+            (right_center, oval_pos(size, origin, -angle - math.pi / 2)),
+            (right_center, oval_pos(size, origin, -angle + math.pi / 2))]
+
+
+def translate_flip(offsets, center):
+    """
+    Return a flipping rectangle from offsets around given center.
+    """
+    return [((center[0] + edge_x) + d_x, (center[1] + edge_y) + d_y)
+            for (edge_x, edge_y), (d_x, d_y) in offsets]
+
+
 def x_flip_rect(size, center, angle, visual_diff=4):
     """
     Return a horizontally flipping rectangle.
     """
-    upper_center = (center[0], center[1] - size[1] / 2.0)
-    lower_center = (center[0], center[1] + size[1] / 2.0)
-    size = (size[0], visual_diff)
-    return [oval_pos(size, upper_center, angle + math.pi),
-            oval_pos(size, upper_center, angle),
-            oval_pos(size, lower_center, -angle),
-            oval_pos(size, lower_center, -angle + math.pi)]
+    return translate_flip(x_flip_offsets(size, angle, visual_diff), center)
 
 
 def y_flip_rect(size, center, angle, visual_diff=4):
     """
     Return a vertically flipping rectangle.
     """
-    left_center = (center[0] - size[0] / 2.0, center[1])
-    right_center = (center[0] + size[0] / 2.0, center[1])
-    size = (visual_diff, size[1])
-    return [oval_pos(size, left_center, angle + math.pi / 2),
-            oval_pos(size, left_center, angle - math.pi / 2),
-            oval_pos(size, right_center, -angle - math.pi / 2),
-            oval_pos(size, right_center, -angle + math.pi / 2)]
+    return translate_flip(y_flip_offsets(size, angle, visual_diff), center)
+
+
+FLIP_OFFSETS = {x_flip_rect: x_flip_offsets, y_flip_rect: y_flip_offsets}
+
+
+def flip_table(flip_fn, size, start, stop, frames_template):
+    """
+    Return the frames of a flip from start to stop angle, each as
+    (angle, front facing up, rectangle offsets). Tables are cached
+    by flip function, size, angles and frames template.
+    """
+    key = flip_fn, size, start, stop, tuple(frames_template)
+    try:
+        return FLIP_TABLES[key]
+    except KeyError:
+        offsets_fn = FLIP_OFFSETS[flip_fn]
+        table = []
+        for ratio in frames_template:
+            angle = slice_at(start, stop, ratio)
+            table.append((angle, flip_front(angle),
+                          offsets_fn(size, angle)))
+        FLIP_TABLES[key] = table
+        return table
+
+
+class Clock:
+    """
+    Elapsed-time clock. Each frame of a frames template lasts one
+    frame time, so a template of n frames takes n frame times.
+    """
+    def __init__(self, frame_time=FRAME_TIME):
+        """
+        Initialize a clock with given frame time in seconds.
+        """
+        self.frame_time = frame_time
+
+    def get_time(self):
+        """
+        Return the current time in seconds.
+        """
+        return time.time()
+
+    def get_frame_time(self):
+        """
+        Return the duration of one frame.
+        """
+        return self.frame_time
+
+
+class Scheduler:
+    """
+    Set of active animations, each with the item it animates.
+    Animations join when they get moves and leave when they finish,
+    so a tick costs nothing for idle animations.
+    """
+    def __init__(self):
+        """
+        Initialize an empty scheduler.
+        """
+        self.active = {}
+
+    def __len__(self):
+        """
+        Return the number of active animations.
+        """
+        return len(self.active)
+
+    def add(self, ani, item):
+        """
+        Activate an animation of given item.
+        """
+        self.active[ani] = item
+
+    def remove(self, ani):
+        """
+        Deactivate an animation if active.
+        """
+        self.active.pop(ani, None)
+
+    def is_active(self, ani):
+        """
+        Return true if given animation is active.
+        """
+        return ani in self.active
+
+    def tick(self):
+        """
+        Update every active animation once, and remove finished ones.
+        """
+        for ani, item in self.active.items():
+            ani.update(item)
+            if not ani.is_moving():
+                del self.active[ani]
 
 
 class Animation:
     """
-    One-dimension animation class.
+    One-dimension animation class. Moves are queued as segments of
+    (start, stop, frames template), and a cursor of segment and frame
+    steps through them, computing each frame only when consumed.
+
+    By default each update shows the next frame. With a clock, each
+    update shows the frame due at the current time, skipping frames
+    when updates fall behind and repeating one when they run ahead.
     """
     def __init__(self):
         """
         Initialize an 1-dimension animation.
         """
         self.stop = 0
-        self.moves = []
+        self.segments = []
+        self.segment = 0
+        self.frame = 0
+        self.clock = None
+        self.started = None
+        self.scheduler = None
+        self.item = None
+
+    def get_clock(self):
+        """
+        Return clock, or None if advancing by update.
+        """
+        return self.clock
+
+    def set_clock(self, clock):
+        """
+        Set a clock to advance by, or None to advance by update.
+        """
+        self.clock = clock
+        self.started = None
+
+    def get_scheduler(self):
+        """
+        Return scheduler, or None if updated by its item.
+        """
+        return self.scheduler
+
+    def set_scheduler(self, scheduler, item=None):
+        """
+        Set a scheduler to update this animation of given item while
+        moving, or None to leave updates to the item.
+        """
+        if self.scheduler is not None:
+            self.scheduler.remove(self)
+        self.scheduler = scheduler
+        self.item = item
+        if scheduler is not None and self.is_moving():
+            scheduler.add(self, item)
 
     def get_stop(self):
         """
@@ -92,24 +285,84 @@ class Animation:
             stop += self.stop
         if not frames_template:
             frames_template = [1]
+        self.add_segment(stop, frames_template)
 
-        self.moves += slices(self.stop, stop, frames_template)
+    def add_segment(self, stop, frames_template):
+        """
+        Queue a move from current stop to given stop, and activate
+        this animation in its scheduler.
+        """
+        self.segments.append((self.stop, stop, frames_template))
         self.stop = stop
+        if self.scheduler is not None:
+            self.scheduler.add(self, self.item)
+
+    def slice_at(self, start, stop, ratio):
+        """
+        Return the frame at given ratio from start to stop.
+        """
+        return slice_at(start, stop, ratio)
 
     def is_moving(self):
         """
         Return true if moving.
         """
-        if self.moves:
-            return True
-        return False
+        return self.segment < len(self.segments)
+
+    def seek(self, now):
+        """
+        Move the cursor to the frame due at given time, skipping
+        segments that are already over.
+        """
+        if self.started is None:
+            self.started = now
+        frame_time = self.clock.get_frame_time()
+        while True:
+            frames = len(self.segments[self.segment][2])
+            frame = max(int((now - self.started) / frame_time), 0)
+            if frame < frames or self.segment + 1 == len(self.segments):
+                self.frame = min(frame, frames - 1)
+                return
+            self.started += frames * frame_time
+            self.segment += 1
 
     def update(self, item):
         """
-        Remove and return the current move.
+        Advance the cursor and return the current move.
         """
-        if self.moves:
-            return self.moves.pop(0)
+        if self.segment < len(self.segments):
+            if self.clock is not None:
+                self.seek(self.clock.get_time())
+            start, stop, frames_template = self.segments[self.segment]
+            move = self.slice_at(start, stop, frames_template[self.frame])
+            self.advance()
+            return move
+
+    def advance(self):
+        """
+        Step the cursor past the current frame.
+        """
+        frames_template = self.segments[self.segment][2]
+        self.frame += 1
+        if self.frame == len(frames_template):
+            self.frame = 0
+            self.segment += 1
+            if self.started is not None:
+                frame_time = self.clock.get_frame_time()
+                self.started += len(frames_template) * frame_time
+            # drop finished segments once they are half the queue,
+            # amortized O(1) per segment
+            if self.segment * 2 >= len(self.segments):
+                del self.segments[:self.segment]
+                self.segment = 0
+            if not self.segments:
+                self.started = None
+
+    def apply(self, item, move):
+        """
+        Override to apply a move to given item.
+        """
+        pass
 
 
 class NAnimation(Animation):
@@ -131,9 +384,13 @@ class NAnimation(Animation):
             stop = list_add(self.stop, stop)
         if not frames_template:
             frames_template = [1]
+        self.add_segment(stop, frames_template)
 
-        self.moves += list_slices(self.stop, stop, frames_template)
-        self.stop = stop
+    def slice_at(self, start, stop, ratio):
+        """
+        Override to slice every dimension.
+        """
+        return list_slice_at(start, stop, ratio)
 
 
 class Moving(NAnimation):
@@ -145,8 +402,13 @@ class Moving(NAnimation):
         Override to update the position of given item.
         """
         if self.is_moving():
-            move = Animation.update(self, item)
-            item.set_center(move)
+            self.apply(item, Animation.update(self, item))
+
+    def apply(self, item, move):
+        """
+        Override to move given item.
+        """
+        item.set_center(move)
 
 
 class Resizing(NAnimation):
@@ -158,13 +420,20 @@ class Resizing(NAnimation):
         Override to update the size of given item.
         """
         if self.is_moving():
-            move = Animation.update(self, item)
-            item.set_size(move)
+            self.apply(item, Animation.update(self, item))
+
+    def apply(self, item, move):
+        """
+        Override to resize given item.
+        """
+        item.set_size(move)
 
 
 class Flipping(Animation):
     """
-    Flipping animation.
+    Flipping animation. With a known flip function, each segment's
+    angles, sides and rectangle offsets come from a cached table, so
+    a frame only translates offsets to the item's center.
     """
     def __init__(self, angle, front_color, back_color):
         """
@@ -177,6 +446,9 @@ class Flipping(Animation):
         self.front_color = front_color
         self.back_color = back_color
         self.flip_fn = x_flip_rect
+        self.table = None
+        self.table_segment = None
+        self.table_size = None
 
     def set_front_color(self, color):
         """
@@ -200,37 +472,61 @@ class Flipping(Animation):
         """
         Return true if front side is facing up.
         """
-        return (0 <= (self.angle + math.pi / 2) % (2 * math.pi)
-                < math.pi)
+        return flip_front(self.angle)
 
-    def update_color(self, item):
+    def update_color(self, item, front=None):
         """
-        Update item's color.
+        Update item's color, by given side unless None.
         """
-        if self.is_front():
+        if front is None:
+            front = self.is_front()
+        if front:
             item.set_color(self.front_color)
             item.set_border_color(self.front_color)
         else:
             item.set_color(self.back_color)
             item.set_border_color(self.back_color)
 
-    def update_rect(self, item):
+    def update_rect(self, item, rect=None):
         """
-        Update item's rectangle.
+        Update item's rectangle, computing it unless given.
         """
-        rect = self.flip_fn(item.get_size(),
-                            item.get_center(),
-                            self.angle)
+        if rect is None:
+            rect = self.flip_fn(item.get_size(),
+                                item.get_center(),
+                                self.angle)
         item.set_rect(rect)
 
     def update(self, item):
         """
         Override to update color and rectangle of given item.
         """
-        if self.is_moving():
-            self.angle = Animation.update(self, item)
-            self.update_color(item)
-            self.update_rect(item)
+        if not self.is_moving():
+            return
+        if self.flip_fn not in FLIP_OFFSETS:
+            self.apply(item, Animation.update(self, item))
+            return
+
+        if self.clock is not None:
+            self.seek(self.clock.get_time())
+        segment = self.segments[self.segment]
+        size = item.get_size()
+        if segment is not self.table_segment or size != self.table_size:
+            self.table = flip_table(self.flip_fn, size, *segment)
+            self.table_segment = segment
+            self.table_size = size
+        angle, front, offsets = self.table[self.frame]
+        self.advance()
+        self.apply(item, angle,
+                   translate_flip(offsets, item.get_center()), front)
+
+    def apply(self, item, move, rect=None, front=None):
+        """
+        Override to flip given item to an angle.
+        """
+        self.angle = move
+        self.update_color(item, front)
+        self.update_rect(item, rect)
 
 
 class MixAnimation(Animation):
@@ -246,10 +542,32 @@ class MixAnimation(Animation):
 
     def add_animation(self, ani):
         """
-        Add an animation.
+        Add an animation, sharing this animation's clock if set.
         """
+        if self.clock is not None:
+            ani.set_clock(self.clock)
+        if self.scheduler is not None:
+            ani.set_scheduler(self.scheduler, self.item)
         self.animations[type(ani)] = ani
 
+    def set_clock(self, clock):
+        """
+        Override to set clock of all animations.
+        """
+        Animation.set_clock(self, clock)
+        for ani in self.animations.values():
+            ani.set_clock(clock)
+
+    def set_scheduler(self, scheduler, item=None):
+        """
+        Override to set scheduler of all animations. Only they are
+        added to it, never this composite.
+        """
+        self.scheduler = scheduler
+        self.item = item
+        for ani in self.animations.values():
+            ani.set_scheduler(scheduler, item)
+
     def get_animation(self, ani_type):
         """
         Return an animation of given type.
@@ -304,3 +622,302 @@ class MixAnimation(Animation):
         else:
             for ani in self.animations.values():
                 ani.update(item)
+
+
+def x_flip_rects(sizes, centers, angles, visual_diff=4):
+    """
+    Return horizontally flipping rectangles as an (n, 4, 2) array,
+    one row per size, center and angle of given arrays.
+    """
+    half_height = sizes[:, 1] / 2.0
+    half_width = sizes[:, 0] / 2
+    upper = centers[:, 1] - half_height
+    lower = centers[:, 1] + half_height
+    rects = numpy.empty((len(angles), 4, 2))
+    for idx, (pos_y, angle) in enumerate(((upper, angles + math.pi),
+                                          (upper, angles),
+                                          (lower, -angles),
+                                          (lower, -angles + math.pi))):
+        rects[:, idx, 0] = centers[:, 0] + numpy.cos(angle) * half_width
+        rects[:, idx, 1] = pos_y + numpy.sin(angle) * visual_diff / 2
+    return rects
+
+
+def y_flip_rects(sizes, centers, angles, visual_diff=4):
+    """
+    Return vertically flipping rectangles as an (n, 4, 2) array,
+    one row per size, center and angle of given arrays.
+    """
+    half_width = sizes[:, 0] / 2.0
+    half_height = sizes[:, 1] / 2
+    left = centers[:, 0] - half_width
+    right = centers[:, 0] + half_width
+    rects = numpy.empty((len(angles), 4, 2))
+    for idx, (pos_x, angle) in enumerate(
+            ((left, angles + math.pi / 2),
+             (left, angles - math.pi / 2),
+             (right, -angles - math.pi / 2),
+             (right, -angles + math.pi / 2))):
+        rects[:, idx, 0] = pos_x + numpy.cos(angle) * visual_diff / 2
+        rects[:, idx, 1] = centers[:, 1] + numpy.sin(angle) * half_height
+    return rects
+
+
+FLIP_RECTS = {x_flip_rect: x_flip_rects, y_flip_rect: y_flip_rects}
+
+
+def grow_rows(array, capacity, fill=0):
+    """
+    Return a copy of an array with more rows, padded with fill.
+    """
+    ans = numpy.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+    ans.fill(fill)
+    ans[:len(array)] = array
+    return ans
+
+
+class BatchScheduler(Scheduler):
+    """
+    Scheduler that keeps the current segment of every active one or
+    two dimension animation in NumPy arrays, and slices all of them
+    with a few array operations per tick. Flipping rectangles are
+    computed the same way. Only segment ends and writing moves back
+    to items run per animation.
+
+    A flipping item's size and center are read when its segment
+    starts, so items should not move while they flip.
+    """
+    def __init__(self, capacity=16):
+        """
+        Initialize an empty batch with room for given animations.
+        """
+        if numpy is None:
+            raise ImportError('BatchScheduler requires NumPy')
+        Scheduler.__init__(self)
+        self.count = 0
+        self.anis = []
+        self.items = []
+        self.rows = {}
+        self.dims = []
+        self.exact = []
+        self.clocks = []
+        self.starts = numpy.zeros((capacity, 2))
+        self.stops = numpy.zeros((capacity, 2))
+        self.curves = numpy.ones((capacity, 1))
+        self.lengths = numpy.ones(capacity, dtype=int)
+        self.frames = numpy.zeros(capacity, dtype=int)
+        self.frame_times = numpy.zeros(capacity)
+        self.started = numpy.zeros(capacity)
+        self.clock_ids = numpy.zeros(capacity, dtype=int)
+        self.flips = numpy.zeros(capacity, dtype=int)
+        self.sizes = numpy.zeros((capacity, 2))
+        self.centers = numpy.zeros((capacity, 2))
+
+    def reserve(self, capacity):
+        """
+        Grow arrays to hold at least given number of animations.
+        """
+        if capacity <= len(self.lengths):
+            return
+        capacity = max(capacity, 2 * len(self.lengths))
+        for name in ('starts', 'stops', 'curves', 'lengths', 'frames',
+                     'frame_times', 'started', 'clock_ids', 'flips',
+                     'sizes', 'centers'):
+            setattr(self, name, grow_rows(getattr(self, name), capacity))
+
+    def add(self, ani, item):
+        """
+        Override to load a newly active animation into the arrays.
+        """
+        if ani in self.active:
+            return
+        Scheduler.add(self, ani, item)
+        row = self.count
+        self.reserve(row + 1)
+        self.count += 1
+        self.anis.append(ani)
+        self.items.append(item)
+        self.dims.append(None)
+        self.exact.append(None)
+        self.rows[ani] = row
+        self.load(row)
+
+    def load(self, row):
+        """
+        Copy the current segment of the animation at given row.
+        """
+        ani = self.anis[row]
+        item = self.items[row]
+        start, stop, frames_template = ani.segments[ani.segment]
+        length = len(frames_template)
+        if length > self.curves.shape[1]:
+            curves = numpy.ones((len(self.curves), length))
+            curves[:, :self.curves.shape[1]] = self.curves
+            self.curves = curves
+        self.curves[row, :length] = frames_template
+        self.curves[row, length:] = frames_template[-1]
+        self.lengths[row] = length
+        self.frames[row] = ani.frame
+        if numpy.ndim(start) == 0:
+            self.dims[row] = 1
+            values = [start, stop]
+        else:
+            self.dims[row] = len(start)
+            values = list(start) + list(stop)
+        # integer moves at integer ratios stay integers, as in update
+        self.exact[row] = None
+        if all(isinstance(value, int) for value in values):
+            self.exact[row] = frames_template
+        self.starts[row] = start
+        self.stops[row] = stop
+
+        clock = ani.get_clock()
+        self.frame_times[row] = 0
+        if clock is not None:
+            if clock not in self.clocks:
+                self.clocks.append(clock)
+            self.clock_ids[row] = self.clocks.index(clock)
+            self.frame_times[row] = clock.get_frame_time()
+            self.started[row] = (numpy.nan if ani.started is None
+                                 else ani.started)
+
+        self.flips[row] = 0
+        if isinstance(ani, Flipping) and ani.flip_fn in FLIP_RECTS:
+            self.flips[row] = 1 if ani.flip_fn is x_flip_rect else 2
+            self.sizes[row] = item.get_size()
+            self.centers[row] = item.get_center()
+
+    def sync(self, row):
+        """
+        Copy the cursor at given row back to its animation.
+        """
+        ani = self.anis[row]
+        ani.frame = int(self.frames[row])
+        if self.frame_times[row] and not numpy.isnan(self.started[row]):
+            ani.started = float(self.started[row])
+
+    def remove(self, ani):
+        """
+        Override to sync the cursor of an animation and drop its row.
+        """
+        if ani in self.active:
+            self.sync(self.rows[ani])
+            self.drop(ani)
+
+    def drop(self, ani):
+        """
+        Drop the row of an animation, moving the last row into its
+        place.
+        """
+        Scheduler.remove(self, ani)
+        row = self.rows.pop(ani)
+        self.count -= 1
+        last = self.count
+        if row != last:
+            for name in ('starts', 'stops', 'curves', 'lengths', 'frames',
+                         'frame_times', 'started', 'clock_ids', 'flips',
+                         'sizes', 'centers'):
+                array = getattr(self, name)
+                array[row] = array[last]
+            self.anis[row] = self.anis[last]
+            self.items[row] = self.items[last]
+            self.dims[row] = self.dims[last]
+            self.exact[row] = self.exact[last]
+            self.rows[self.anis[row]] = row
+        self.anis.pop()
+        self.items.pop()
+        self.dims.pop()
+        self.exact.pop()
+
+    def seek(self):
+        """
+        Move the frames of clocked rows to the frame due now. Rows
+        past their segment seek in Python, to skip whole segments.
+        """
+        count = self.count
+        frame_times = self.frame_times[:count]
+        clocked = frame_times > 0
+        if not clocked.any():
+            return
+        nows = numpy.array([clock.get_time() for clock in self.clocks])
+        nows = nows[self.clock_ids[:count]]
+        started = self.started[:count]
+        fresh = clocked & numpy.isnan(started)
+        started[fresh] = nows[fresh]
+        due = numpy.zeros(count, dtype=int)
+        due[clocked] = numpy.floor((nows[clocked] - started[clocked]) /
+                                   frame_times[clocked])
+        # a segment may start after now: show its first frame, as seek does
+        numpy.maximum(due, 0, due)
+        lengths = self.lengths[:count]
+        on_time = clocked & (due < lengths)
+        late = numpy.flatnonzero(clocked & ~on_time)
+        self.frames[:count][on_time] = due[on_time]
+        for row in late.tolist():
+            ani = self.anis[row]
+            ani.started = float(started[row])
+            ani.seek(float(nows[row]))
+            self.load(row)
+
+    def tick(self):
+        """
+        Override to slice every active animation in one pass.
+        """
+        count = self.count
+        if not count:
+            return
+        self.seek()
+        frames = self.frames[:count]
+        ratios = self.curves[numpy.arange(count), frames]
+        starts = self.starts[:count]
+        moves = starts + (self.stops[:count] - starts) * ratios[:, None]
+
+        flips = self.flips[:count]
+        rects = {}
+        for flip, flip_rects in ((1, x_flip_rects), (2, y_flip_rects)):
+            rows = numpy.flatnonzero(flips == flip)
+            if len(rows):
+                rects.update(zip(rows.tolist(), flip_rects(
+                    self.sizes[rows], self.centers[rows],
+                    moves[rows, 0]).tolist()))
+
+        done = numpy.flatnonzero(frames >= self.lengths[:count] - 1)
+        shown = frames.tolist()
+        frames += 1
+
+        moves = moves.tolist()
+        for row in range(count):
+            ani = self.anis[row]
+            item = self.items[row]
+            move = moves[row][:self.dims[row]]
+            exact = self.exact[row]
+            if exact is not None and isinstance(exact[shown[row]], int):
+                move = [int(value) for value in move]
+            if self.dims[row] == 1:
+                move = move[0]
+            else:
+                move = tuple(move)
+            if row in rects:
+                ani.apply(item, move, [tuple(pos) for pos in rects[row]])
+            else:
+                ani.apply(item, move)
+
+        # end segments from the last row, so moved rows are done
+        for row in done[::-1].tolist():
+            ani = self.anis[row]
+            self.sync(row)
+            ani.frame = int(self.lengths[row]) - 1
+            ani.advance()
+            if ani.is_moving():
+                self.load(row)
+            else:
+                self.drop(ani)
+
+
+def new_scheduler():
+    """
+    Return a batch scheduler if NumPy is available, else a scheduler.
+    """
+    if numpy is None:
+        return Scheduler()
+    return BatchScheduler()
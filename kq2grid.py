@@ -1,20 +1,200 @@
 """
 Grid
 """
+import copy
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 EMPTY = 0
+CHUNK_SIZE = 16
+ZOBRIST = {}
+TABLES = {}
 
 
 def empty_grid(rows, cols):
     """
-    Return an empty gird.
+    Return an empty grid as one flat row-major list.
+    """
+    return [EMPTY] * (rows * cols)
+
+
+def cells_mask(cells):
+    """
+    Return the footprint of given cells: its upper left corner and a
+    list of (row offset, column bitmask) pairs relative to that corner.
+    """
+    if not cells:
+        return (0, 0), []
+    min_row = min(row for row, _ in cells)
+    min_col = min(col for _, col in cells)
+    masks = {}
+    for row, col in cells:
+        row -= min_row
+        masks[row] = masks.get(row, 0) | 1 << (col - min_col)
+    return (min_row, min_col), sorted(masks.items())
+
+
+def zobrist_value(index, key):
+    """
+    Return the 64-bit random number of a hash key at a flat index.
+    It is seeded by index and key alone, so a board hashes the same
+    in every process. Keys of None hash to zero.
+    """
+    if key is None:
+        return 0
+    try:
+        return ZOBRIST[index, key]
+    except KeyError:
+        value = random.Random(hash((index, key))).getrandbits(64)
+        ZOBRIST[index, key] = value
+        return value
+
+
+def occupied_key(_tile):
+    """
+    Return the same hash key for every tile, hashing occupancy only.
     """
-    return [[EMPTY for _ in range(cols)]
-            for _ in range(rows)]
+    return 1
 
 
-class Grid:
+def grid_tables(rows, cols):
     """
-    2D grid.
+    Return the shared cell tables of given board size.
+    """
+    try:
+        return TABLES[rows, cols]
+    except KeyError:
+        TABLES[rows, cols] = GridTables(rows, cols)
+        return TABLES[rows, cols]
+
+
+class GridTables:
+    """
+    Immutable cell tables of one board size. Each table is built
+    on first use and shared by every grid of that size.
+    """
+    def __init__(self, rows, cols):
+        """
+        Initialize empty tables.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.cells = None
+        self.row_cells = {}
+        self.col_cells = {}
+        self.lines = {}
+        self.neighbors = {}
+        self.index_lines = {}
+        self.index_neighbors = {}
+
+    def is_valid(self, row, col):
+        """
+        Return true if given cell is on board.
+        """
+        return 0 <= row < self.rows and 0 <= col < self.cols
+
+    def get_cells(self):
+        """
+        Return all cells in row-major order.
+        """
+        if self.cells is None:
+            self.cells = tuple((row, col)
+                               for row in range(self.rows)
+                               for col in range(self.cols))
+        return self.cells
+
+    def get_row(self, row):
+        """
+        Return cells in given row.
+        """
+        try:
+            return self.row_cells[row]
+        except KeyError:
+            cells = tuple((row, col) for col in range(self.cols))
+            self.row_cells[row] = cells
+            return cells
+
+    def get_col(self, col):
+        """
+        Return cells in given column.
+        """
+        try:
+            return self.col_cells[col]
+        except KeyError:
+            cells = tuple((row, col) for row in range(self.rows))
+            self.col_cells[col] = cells
+            return cells
+
+    def get_lines(self, offset):
+        """
+        Return every line of cells that starts at the board edge
+        and walks by given offset until it leaves the board.
+        """
+        try:
+            return self.lines[offset]
+        except KeyError:
+            d_row, d_col = offset
+            lines = []
+            for row, col in self.get_cells():
+                if self.is_valid(row - d_row, col - d_col):
+                    continue
+                line = []
+                while self.is_valid(row, col):
+                    line.append((row, col))
+                    row += d_row
+                    col += d_col
+                lines.append(tuple(line))
+            self.lines[offset] = tuple(lines)
+            return self.lines[offset]
+
+    def get_neighbors(self, row, col):
+        """
+        Return the on-board four neighbors of given cell.
+        """
+        try:
+            return self.neighbors[row, col]
+        except KeyError:
+            cells = tuple((row + d_row, col + d_col)
+                          for d_row, d_col in ((-1, 0), (1, 0),
+                                               (0, -1), (0, 1))
+                          if self.is_valid(row + d_row, col + d_col))
+            self.neighbors[row, col] = cells
+            return cells
+
+    def get_index_lines(self, offset):
+        """
+        Return the lines of get_lines as flat cell indices.
+        """
+        try:
+            return self.index_lines[offset]
+        except KeyError:
+            lines = tuple(tuple(row * self.cols + col for row, col in line)
+                          for line in self.get_lines(offset))
+            self.index_lines[offset] = lines
+            return lines
+
+    def get_index_neighbors(self, index):
+        """
+        Return the flat indices of the on-board four neighbors of
+        the cell at given flat index.
+        """
+        try:
+            return self.index_neighbors[index]
+        except KeyError:
+            row, col = divmod(index, self.cols)
+            indices = tuple(n_row * self.cols + n_col for n_row, n_col
+                            in self.get_neighbors(row, col))
+            self.index_neighbors[index] = indices
+            return indices
+
+
+class Grid(object):
+    """
+    2D grid, stored as one flat row-major list of cells.
     """
     def __init__(self, rows, cols):
         """
@@ -22,7 +202,17 @@ class Grid:
         """
         self.rows = rows
         self.cols = cols
-        self.cells = empty_grid(rows, cols)
+        self.full_mask = (1 << cols) - 1
+        self.init_storage()
+        self.init_indexes()
+        self.hash_key = None
+        self.keys = None
+        self.zobrist = 0
+        self.shared = False
+        self.owned = set()
+        self.tables = grid_tables(rows, cols)
+        self.journal = None
+        self.listeners = []
 
     def __len__(self):
         """
@@ -34,16 +224,240 @@ class Grid:
         """
         Iterate through every cell.
         """
-        for row in range(self.rows):
-            for col in range(self.cols):
-                yield row, col
+        return iter(self.tables.get_cells())
 
-    def reset(self):
+    def init_storage(self):
         """
-        Set all cells empty.
+        Initialize cell storage.
         """
         self.cells = empty_grid(self.rows, self.cols)
 
+    def init_indexes(self):
+        """
+        Initialize row masks, row and column counts and the top row.
+        """
+        self.row_masks = [0] * self.rows
+        self.row_counts = [0] * self.rows
+        self.col_counts = [0] * self.cols
+        self.top_nonempty = self.rows
+
+    def reset_storage(self):
+        """
+        Set cell storage and hash keys empty, in place unless shared
+        with a fork.
+        """
+        if self.shared:
+            self.cells = empty_grid(self.rows, self.cols)
+        else:
+            self.cells[:] = empty_grid(self.rows, self.cols)
+        if self.keys is not None:
+            self.keys = self.new_keys()
+
+    def reset(self):
+        """
+        Set all cells empty, in place.
+        """
+        if self.journal is not None:
+            self.journal.extend(
+                divmod(index, self.cols) + (tile, EMPTY)
+                for index, tile in self.occupied_tiles().items())
+        self.reset_storage()
+        self.init_indexes()
+        self.zobrist = 0
+        self.shared = False
+
+    def get_state(self):
+        """
+        Return grid contents and indexes as a tuple.
+        """
+        return (self.cells, self.row_masks, self.row_counts,
+                self.col_counts, self.top_nonempty, self.keys, self.zobrist)
+
+    def set_state(self, state):
+        """
+        Replace grid contents and indexes by given state.
+        """
+        (self.cells, self.row_masks, self.row_counts, self.col_counts,
+         self.top_nonempty, self.keys, self.zobrist) = state
+
+    def copy_state(self, state):
+        """
+        Return a copy of given state that shares no containers with it.
+        """
+        (cells, row_masks, row_counts, col_counts,
+         top_nonempty, keys, zobrist) = state
+        if keys is not None:
+            keys = list(keys)
+        return (list(cells), list(row_masks), list(row_counts),
+                list(col_counts), top_nonempty, keys, zobrist)
+
+    def fork_state(self, state):
+        """
+        Return the state a fork starts from. Grid state is shared
+        whole and copied on the first write.
+        """
+        return state
+
+    def snapshot(self):
+        """
+        Return a copy of grid state to be given back to restore.
+        Tiles themselves are not copied.
+        """
+        return self.copy_state(self.get_state())
+
+    def restore(self, snapshot):
+        """
+        Set grid state back to a snapshot. The snapshot stays valid,
+        so it can be restored again.
+        """
+        if self.journal is not None:
+            old_tiles = self.occupied_tiles()
+        self.set_state(self.copy_state(snapshot))
+        self.shared = False
+        if self.journal is not None:
+            new_tiles = self.occupied_tiles()
+            for index in set(old_tiles) | set(new_tiles):
+                old_tile = old_tiles.get(index, EMPTY)
+                tile = new_tiles.get(index, EMPTY)
+                if old_tile is not tile:
+                    self.journal.append(divmod(index, self.cols)
+                                        + (old_tile, tile))
+
+    def fork(self):
+        """
+        Return a shallow clone that shares grid state with this grid
+        until either of them is written (copy-on-write).
+        Tiles are shared, so treat them as immutable in both grids.
+        """
+        clone = copy.copy(self)
+        clone.journal = None
+        clone.listeners = []
+        clone.set_state(self.fork_state(self.get_state()))
+        for grid in self, clone:
+            grid.shared = True
+            grid.owned = set()
+        return clone
+
+    def unshare(self):
+        """
+        Take a private copy of all grid state.
+        """
+        self.set_state(self.copy_state(self.get_state()))
+        self.shared = False
+
+    def unshare_cell(self, row, col):
+        """
+        Take a private copy of grid state before writing to given
+        cell.
+        """
+        self.unshare()
+
+    def set_hash_key(self, hash_key):
+        """
+        Start hashing grid contents. Given function maps a tile to a
+        hashable key; tiles with equal keys hash the same.
+        """
+        self.hash_key = hash_key
+        self.keys = self.new_keys()
+        self.zobrist = 0
+        for row, col in self.occupied_cells():
+            self.rehash(row * self.cols + col, self.get_tile(row, col))
+
+    def new_keys(self):
+        """
+        Return empty per-cell hash key storage.
+        """
+        return [None] * (self.rows * self.cols)
+
+    def get_hash(self):
+        """
+        Return the Zobrist hash of grid contents.
+        """
+        return self.zobrist
+
+    def rehash(self, index, tile):
+        """
+        Update the hash for a tile at given flat index.
+        """
+        key = None if tile is EMPTY else self.hash_key(tile)
+        old_key = self.keys[index]
+        if key != old_key:
+            self.keys[index] = key
+            self.zobrist ^= (zobrist_value(index, old_key) ^
+                             zobrist_value(index, key))
+
+    def refresh_tile(self, row, col):
+        """
+        Tell grid the tile at given cell changed in place: update the
+        hash and record the change.
+        """
+        tile = self.get_tile(row, col)
+        if self.keys is not None:
+            if self.shared:
+                self.unshare_cell(row, col)
+            self.rehash(row * self.cols + col, tile)
+        if self.journal is not None:
+            self.journal.append((row, col, tile, tile))
+
+    def watch(self):
+        """
+        Start recording changed cells in the journal.
+        """
+        if self.journal is None:
+            self.journal = []
+
+    def unwatch(self):
+        """
+        Stop recording changed cells and drop subscribers.
+        """
+        self.journal = None
+        self.listeners = []
+
+    def subscribe(self, listener):
+        """
+        Call given listener with the list of changes on every drain.
+        """
+        self.watch()
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """
+        Remove a listener.
+        """
+        self.listeners.remove(listener)
+
+    def drain_changes(self):
+        """
+        Return changes recorded since last drain as a list of
+        (row, col, old tile, new tile), and pass it to every listener.
+        Call once per tick.
+        """
+        changes = self.journal or []
+        if self.journal is not None:
+            self.journal = []
+        for listener in self.listeners:
+            listener(changes)
+        return changes
+
+    def occupied_tiles(self):
+        """
+        Return a dictionary of tiles by flat index of occupied cells.
+        """
+        return dict((row * self.cols + col, self.get_tile(row, col))
+                    for row, col in self.occupied_cells())
+
+    def get_index(self, row, col):
+        """
+        Return the flat index of given cell.
+        """
+        return row * self.cols + col
+
+    def get_cell(self, index):
+        """
+        Return the cell of given flat index.
+        """
+        return divmod(index, self.cols)
+
     def get_rows(self):
         """
         Return the number of rows.
@@ -60,25 +474,124 @@ class Grid:
         """
         Return cells in given row.
         """
-        return [(row, col) for col in range(self.cols)]
+        return self.tables.get_row(row)
 
     def get_col(self, col):
         """
         Returns cells in given column.
         """
-        return [(row, col) for row in range(self.rows)]
+        return self.tables.get_col(col)
+
+    def get_lines(self, offset):
+        """
+        Return every line of cells walking by given offset,
+        each starting at the board edge.
+        """
+        return self.tables.get_lines(offset)
+
+    def get_neighbors(self, row, col):
+        """
+        Return the four neighbors of given cell that are in grid.
+        """
+        return self.tables.get_neighbors(row, col)
+
+    def get_index_lines(self, offset):
+        """
+        Return the lines of get_lines as flat indices.
+        """
+        return self.tables.get_index_lines(offset)
+
+    def get_index_neighbors(self, index):
+        """
+        Return the flat indices of the four neighbors in grid of
+        the cell at given flat index.
+        """
+        return self.tables.get_index_neighbors(index)
+
+    def get_index_tile(self, index):
+        """
+        Return the tile at given flat index.
+        """
+        return self.cells[index]
+
+    def set_index_tile(self, index, tile):
+        """
+        Set a tile at given flat index.
+        """
+        row = index // self.cols
+        col = index - row * self.cols
+        old_tile = self.cells[index]
+        if self.shared:
+            if old_tile is tile:
+                return
+            self.unshare_cell(row, col)
+        self.cells[index] = tile
+        self.update_indexes(row, col, index, old_tile, tile)
+
+    def pop_index_tile(self, index):
+        """
+        Remove the tile at given flat index and return it.
+        """
+        tile = self.get_index_tile(index)
+        self.set_index_tile(index, EMPTY)
+        return tile
+
+    def pop_index_tiles(self, indices):
+        """
+        Remove tiles at given flat indices and return them.
+        """
+        return [self.pop_index_tile(index) for index in indices
+                if self.get_index_tile(index)]
 
     def get_tile(self, row, col):
         """
         Return the tile at given cell.
         """
-        return self.cells[row][col]
+        return self.cells[row * self.cols + col]
 
     def set_tile(self, row, col, tile):
         """
         Set a tile at given cell.
         """
-        self.cells[row][col] = tile
+        index = row * self.cols + col
+        old_tile = self.cells[index]
+        if self.shared:
+            if old_tile is tile:
+                return
+            self.unshare_cell(row, col)
+        self.cells[index] = tile
+        self.update_indexes(row, col, index, old_tile, tile)
+
+    def update_indexes(self, row, col, index, old_tile, tile):
+        """
+        Update cell indexes and hash after a cell changed.
+        """
+        if (old_tile is EMPTY) is not (tile is EMPTY):
+            if tile is EMPTY:
+                self.row_masks[row] &= ~(1 << col)
+                self.row_counts[row] -= 1
+                self.col_counts[col] -= 1
+                if row == self.top_nonempty:
+                    while (self.top_nonempty < self.rows and
+                           not self.row_counts[self.top_nonempty]):
+                        self.top_nonempty += 1
+            else:
+                self.row_masks[row] |= 1 << col
+                self.row_counts[row] += 1
+                self.col_counts[col] += 1
+                if row < self.top_nonempty:
+                    self.top_nonempty = row
+        if self.keys is not None or self.journal is not None:
+            self.record_change(row, col, index, old_tile, tile)
+
+    def record_change(self, row, col, index, old_tile, tile):
+        """
+        Update the hash and journal after a cell changed.
+        """
+        if self.keys is not None:
+            self.rehash(index, tile)
+        if self.journal is not None and old_tile is not tile:
+            self.journal.append((row, col, old_tile, tile))
 
     def pop_tile(self, row, col):
         """
@@ -119,15 +632,511 @@ class Grid:
         """
         Return true if given cell is empty.
         """
-        if self.is_valid(row, col):
-            return self.get_tile(row, col) is EMPTY
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return self.cells[row * self.cols + col] is EMPTY
         return False
 
+    def get_row_mask(self, row):
+        """
+        Return the occupancy bitmask of given row, bit i for column i.
+        """
+        return self.row_masks[row]
+
+    def row_count(self, row):
+        """
+        Return the number of occupied cells in given row.
+        """
+        return self.row_counts[row]
+
+    def col_count(self, col):
+        """
+        Return the number of occupied cells in given column.
+        """
+        return self.col_counts[col]
+
+    def is_row_full(self, row):
+        """
+        Return true if every cell in given row is occupied.
+        """
+        return self.row_counts[row] == self.cols
+
+    def highest_nonempty_row(self):
+        """
+        Return the smallest row index with an occupied cell,
+        or the number of rows if grid is empty.
+        """
+        return self.top_nonempty
+
+    def vacant_mask(self, masks, row=0, col=0):
+        """
+        Return true if a footprint from cells_mask, with its upper left
+        corner at given cell, is inside grid and all empty.
+        """
+        if col < 0:
+            return False
+        for row_offset, mask in masks:
+            mask <<= col
+            row_offset += row
+            if (not 0 <= row_offset < self.rows or mask > self.full_mask
+                    or self.row_masks[row_offset] & mask):
+                return False
+        return True
+
     def empty_cells(self):
         """
-        Return all empty cells in grid.
+        Return all empty cells in grid, in no particular order.
         """
-        return [(row, col)
-                for row in range(self.rows)
+        return [(row, col) for row in range(self.rows)
                 for col in range(self.cols)
-                if self.is_empty(row, col)]
+                if not self.row_masks[row] >> col & 1]
+
+    def occupied_cells(self):
+        """
+        Return all occupied cells in grid, in no particular order.
+        """
+        cells = []
+        for row in range(self.top_nonempty, self.rows):
+            mask = self.row_masks[row]
+            while mask:
+                bit = mask & -mask
+                cells.append((row, bit.bit_length() - 1))
+                mask ^= bit
+        return cells
+
+    def random_empty_cell(self):
+        """
+        Return a uniformly random empty cell, or None if grid is full.
+        Cells are sampled until an empty one turns up while grid is
+        mostly empty. Otherwise the k-th empty cell is found through
+        row counts and row masks, in O(rows + cols).
+        """
+        num_cell = self.rows * self.cols
+        num_empty = num_cell - sum(self.row_counts)
+        if 2 * num_empty > num_cell:
+            while True:
+                row, col = divmod(random.randrange(num_cell), self.cols)
+                if not self.row_masks[row] >> col & 1:
+                    return row, col
+        if not num_empty:
+            return None
+        nth = random.randrange(num_empty)
+        for row, count in enumerate(self.row_counts):
+            if nth < self.cols - count:
+                vacant = ~self.row_masks[row] & self.full_mask
+                for _ in range(nth):
+                    vacant &= vacant - 1
+                return row, (vacant & -vacant).bit_length() - 1
+            nth -= self.cols - count
+
+
+class SparseGrid(Grid):
+    """
+    2D grid for very large, mostly empty boards. Cells are stored in
+    square chunks that are allocated when first written and dropped
+    when emptied, so memory grows with occupied cells, not board area.
+    Mix it in before a game class to run that game on sparse storage,
+    e.g. class SparsePentos(SparseGrid, pentos.Game).
+    """
+    def init_storage(self):
+        """
+        Override to start with no chunks.
+        """
+        self.cells = {}
+        self.chunk_counts = {}
+
+    def reset_storage(self):
+        """
+        Override to drop all chunks.
+        """
+        self.init_storage()
+        if self.keys is not None:
+            self.keys = self.new_keys()
+
+    def __iter__(self):
+        """
+        Override to iterate without building a table of every cell.
+        """
+        for row in range(self.rows):
+            for col in range(self.cols):
+                yield row, col
+
+    def get_state(self):
+        """
+        Override to include chunk counts.
+        """
+        return Grid.get_state(self) + (self.chunk_counts,)
+
+    def set_state(self, state):
+        """
+        Override to include chunk counts.
+        """
+        Grid.set_state(self, state[:-1])
+        self.chunk_counts = state[-1]
+
+    def copy_state(self, state):
+        """
+        Override to copy only allocated chunks.
+        """
+        (cells, row_masks, row_counts, col_counts,
+         top_nonempty, keys, zobrist, chunk_counts) = state
+        if keys is not None:
+            keys = dict(keys)
+        return (dict((key, list(chunk)) for key, chunk in cells.items()),
+                list(row_masks), list(row_counts), list(col_counts),
+                top_nonempty, keys, zobrist, dict(chunk_counts))
+
+    def fork_state(self, state):
+        """
+        Override to share chunks.
+        """
+        (cells, row_masks, row_counts, col_counts,
+         top_nonempty, keys, zobrist, chunk_counts) = state
+        if keys is not None:
+            keys = dict(keys)
+        return (dict(cells), list(row_masks), list(row_counts),
+                list(col_counts), top_nonempty, keys, zobrist,
+                dict(chunk_counts))
+
+    def unshare_cell(self, row, col):
+        """
+        Override to copy the chunk of given cell.
+        """
+        key = row // CHUNK_SIZE, col // CHUNK_SIZE
+        if key not in self.owned:
+            chunk = self.cells.get(key)
+            if chunk is not None:
+                self.cells[key] = list(chunk)
+            self.owned.add(key)
+
+    def new_keys(self):
+        """
+        Override to store hash keys of occupied cells only.
+        """
+        return {}
+
+    def rehash(self, index, tile):
+        """
+        Override to read and write hash keys in a dictionary.
+        """
+        key = None if tile is EMPTY else self.hash_key(tile)
+        old_key = self.keys.get(index)
+        if key != old_key:
+            if key is None:
+                del self.keys[index]
+            else:
+                self.keys[index] = key
+            self.zobrist ^= (zobrist_value(index, old_key) ^
+                             zobrist_value(index, key))
+
+    def get_tile(self, row, col):
+        """
+        Override to read from chunks.
+        """
+        chunk = self.cells.get((row // CHUNK_SIZE, col // CHUNK_SIZE))
+        if chunk is None:
+            return EMPTY
+        return chunk[row % CHUNK_SIZE * CHUNK_SIZE + col % CHUNK_SIZE]
+
+    def get_index_tile(self, index):
+        """
+        Override to read from chunks.
+        """
+        row, col = divmod(index, self.cols)
+        return self.get_tile(row, col)
+
+    def set_index_tile(self, index, tile):
+        """
+        Override to write into chunks.
+        """
+        row, col = divmod(index, self.cols)
+        self.set_tile(row, col, tile)
+
+    def set_tile(self, row, col, tile):
+        """
+        Override to write into chunks, allocating and dropping them.
+        """
+        key = row // CHUNK_SIZE, col // CHUNK_SIZE
+        pos = row % CHUNK_SIZE * CHUNK_SIZE + col % CHUNK_SIZE
+        chunk = self.cells.get(key)
+        old_tile = EMPTY if chunk is None else chunk[pos]
+        shared = self.shared and key not in self.owned
+        if old_tile is tile and (shared or tile is EMPTY):
+            return
+        if shared:
+            self.unshare_cell(row, col)
+            chunk = self.cells.get(key)
+        if chunk is None:
+            chunk = empty_grid(CHUNK_SIZE, CHUNK_SIZE)
+            self.cells[key] = chunk
+            self.chunk_counts[key] = 0
+        chunk[pos] = tile
+        if (old_tile is EMPTY) is not (tile is EMPTY):
+            if tile is EMPTY:
+                self.chunk_counts[key] -= 1
+                if not self.chunk_counts[key]:
+                    del self.cells[key]
+                    del self.chunk_counts[key]
+            else:
+                self.chunk_counts[key] += 1
+        self.update_indexes(row, col, row * self.cols + col, old_tile, tile)
+
+    def is_empty(self, row, col):
+        """
+        Override to read from chunks.
+        """
+        if 0 <= row < self.rows and 0 <= col < self.cols:
+            return self.get_tile(row, col) is EMPTY
+        return False
+
+
+class ArrayGrid(Grid):
+    """
+    2D grid backed by NumPy. Tiles are kept in an object array, and a
+    parallel integer array holds one code per cell (0 when empty) for
+    vectorized queries and bulk operations. Requires NumPy.
+    """
+    def init_storage(self):
+        """
+        Override to allocate the tile and code arrays.
+        """
+        if numpy is None:
+            raise ImportError('ArrayGrid requires NumPy')
+        self.cells = numpy.empty(self.rows * self.cols, dtype=object)
+        self.cells.fill(EMPTY)
+        self.codes = numpy.zeros((self.rows, self.cols), dtype=numpy.int64)
+        self.tile_code = occupied_key
+
+    def init_indexes(self):
+        """
+        Override to keep no per-cell indexes; queries read the arrays.
+        """
+        pass
+
+    def reset_storage(self):
+        """
+        Override to clear both arrays, in place unless shared.
+        """
+        if self.shared:
+            self.cells = numpy.empty_like(self.cells)
+            self.codes = numpy.zeros_like(self.codes)
+        self.cells.fill(EMPTY)
+        self.codes.fill(0)
+        if self.keys is not None:
+            self.keys = self.new_keys()
+
+    def set_tile_code(self, tile_code):
+        """
+        Set the function that maps a tile to its non-zero integer code.
+        """
+        self.tile_code = tile_code
+        for row, col in self.occupied_cells():
+            self.codes[row, col] = tile_code(self.get_tile(row, col))
+
+    def get_state(self):
+        """
+        Override for array state.
+        """
+        return self.cells, self.codes, self.keys, self.zobrist
+
+    def set_state(self, state):
+        """
+        Override for array state.
+        """
+        self.cells, self.codes, self.keys, self.zobrist = state
+
+    def copy_state(self, state):
+        """
+        Override to copy arrays.
+        """
+        cells, codes, keys, zobrist = state
+        if keys is not None:
+            keys = list(keys)
+        return cells.copy(), codes.copy(), keys, zobrist
+
+    def get_tile_array(self):
+        """
+        Return tiles as a (rows, cols) object array view.
+        """
+        return self.cells.reshape(self.rows, self.cols)
+
+    def get_code_array(self):
+        """
+        Return the (rows, cols) code array itself.
+        """
+        return self.codes
+
+    def row_view(self, row):
+        """
+        Return the codes of given row as a view, without copying.
+        """
+        return self.codes[row]
+
+    def col_view(self, col):
+        """
+        Return the codes of given column as a view, without copying.
+        """
+        return self.codes[:, col]
+
+    def update_indexes(self, row, col, index, old_tile, tile):
+        """
+        Override to update the code array.
+        """
+        self.codes[row, col] = 0 if tile is EMPTY else self.tile_code(tile)
+        if self.keys is not None or self.journal is not None:
+            self.record_change(row, col, index, old_tile, tile)
+
+    def get_codes_at(self, rows, cols):
+        """
+        Return codes at given arrays of rows and columns.
+        """
+        return self.codes[rows, cols]
+
+    def get_tiles_at(self, rows, cols):
+        """
+        Return tiles at given arrays of rows and columns.
+        """
+        return self.get_tile_array()[rows, cols]
+
+    def set_tiles_at(self, rows, cols, tiles, codes=None):
+        """
+        Set tiles at given arrays of rows and columns. Codes are
+        computed from tiles unless given.
+        """
+        rows = numpy.asarray(rows)
+        cols = numpy.asarray(cols)
+        if self.keys is not None or self.journal is not None:
+            for row, col, tile in zip(rows.tolist(), cols.tolist(), tiles):
+                self.set_tile(row, col, tile)
+            return
+        if self.shared:
+            self.unshare()
+        if codes is None:
+            codes = [0 if tile is EMPTY else self.tile_code(tile)
+                     for tile in tiles]
+        tile_array = numpy.empty(len(rows), dtype=object)
+        tile_array[:] = list(tiles)
+        self.get_tile_array()[rows, cols] = tile_array
+        self.codes[rows, cols] = codes
+
+    def pop_tiles_at(self, rows, cols):
+        """
+        Remove tiles at given arrays of rows and columns,
+        and return them.
+        """
+        tiles = self.get_tiles_at(rows, cols)
+        empty = numpy.empty(len(tiles), dtype=object)
+        empty.fill(EMPTY)
+        self.set_tiles_at(rows, cols, empty, numpy.zeros(len(tiles)))
+        return tiles
+
+    def get_tiles(self, cells):
+        """
+        Override to read all cells in one indexing operation.
+        """
+        if not cells:
+            return []
+        rows, cols = zip(*cells)
+        return self.get_tiles_at(list(rows), list(cols)).tolist()
+
+    def set_tiles(self, cells, tiles):
+        """
+        Override to write all cells in one indexing operation.
+        """
+        if cells:
+            rows, cols = zip(*cells)
+            self.set_tiles_at(list(rows), list(cols), list(tiles))
+
+    def pop_tiles(self, cells):
+        """
+        Override to remove all occupied cells in one operation.
+        """
+        cells = [cell for cell in cells if not self.is_empty(*cell)]
+        if not cells:
+            return []
+        rows, cols = zip(*cells)
+        return self.pop_tiles_at(list(rows), list(cols)).tolist()
+
+    def empty_mask(self):
+        """
+        Return a (rows, cols) boolean array, true where cell is empty.
+        """
+        return self.codes == 0
+
+    def full_rows(self):
+        """
+        Return a boolean array, true for each full row.
+        """
+        return self.codes.all(axis=1)
+
+    def empty_cells(self):
+        """
+        Override to find empty cells in the code array.
+        """
+        return [divmod(index, self.cols) for index in
+                numpy.flatnonzero(self.codes == 0).tolist()]
+
+    def occupied_cells(self):
+        """
+        Override to find occupied cells in the code array.
+        """
+        return [divmod(index, self.cols) for index in
+                numpy.flatnonzero(self.codes).tolist()]
+
+    def random_empty_cell(self):
+        """
+        Override to pick among empty cells of the code array.
+        """
+        indices = numpy.flatnonzero(self.codes == 0)
+        if len(indices):
+            return divmod(int(indices[random.randrange(len(indices))]),
+                          self.cols)
+
+    def get_row_mask(self, row):
+        """
+        Override to build the bitmask from the code array.
+        """
+        mask = 0
+        for col in numpy.flatnonzero(self.codes[row]).tolist():
+            mask |= 1 << col
+        return mask
+
+    def row_count(self, row):
+        """
+        Override to count in the code array.
+        """
+        return int(numpy.count_nonzero(self.codes[row]))
+
+    def col_count(self, col):
+        """
+        Override to count in the code array.
+        """
+        return int(numpy.count_nonzero(self.codes[:, col]))
+
+    def is_row_full(self, row):
+        """
+        Override to test the code array.
+        """
+        return bool(self.codes[row].all())
+
+    def highest_nonempty_row(self):
+        """
+        Override to search the code array.
+        """
+        rows = numpy.flatnonzero(self.codes.any(axis=1))
+        if len(rows):
+            return int(rows[0])
+        return self.rows
+
+    def vacant_mask(self, masks, row=0, col=0):
+        """
+        Override to test against masks built from the code array.
+        """
+        if col < 0:
+            return False
+        for row_offset, mask in masks:
+            mask <<= col
+            row_offset += row
+            if (not 0 <= row_offset < self.rows or mask > self.full_mask
+                    or self.get_row_mask(row_offset) & mask):
+                return False
+        return True
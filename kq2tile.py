@@ -4,10 +4,20 @@ Tile
 import math
 import random
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 UP = (-1, 0)
 DOWN = (1, 0)
 LEFT = (0, -1)
 RIGHT = (0, 1)
+ROTATIONS = {}
+SHAPES = {}
+SYMMETRIC_SHAPES = {}
+OUTLINES = {}
+COLORS = {}
 
 
 def add(tup1, tup2):
@@ -135,15 +145,20 @@ def rotate(point, center, angle):
     return add(center, vec)
 
 
+def rotate_offset(offset, clockwise=True):
+    """
+    Return an offset rotated by 90 degrees.
+    """
+    if clockwise:
+        return offset[1], -offset[0]
+    return -offset[1], offset[0]
+
+
 def rotate_cell(cell, center, clockwise=True):
     """
     Return a rotated cell.
     """
-    if clockwise:
-        row, col = rotate(cell, center, -90)
-    else:
-        row, col = rotate(cell, center, 90)
-    return int(round(row)), int(round(col))
+    return add(center, rotate_offset(sub(cell, center), clockwise))
 
 
 def rotate_cells(cells, center, clockwise=True):
@@ -154,106 +169,332 @@ def rotate_cells(cells, center, clockwise=True):
             for cell in cells]
 
 
+def rotation_table(cells, center):
+    """
+    Return the four clockwise orientations of given cells, each as
+    a tuple of offsets from center. Tables are cached by shape.
+    """
+    offsets = tuple(sub(cell, center) for cell in cells)
+    try:
+        return ROTATIONS[offsets]
+    except KeyError:
+        table = [offsets]
+        for _ in range(3):
+            table.append(tuple(rotate_offset(offset)
+                               for offset in table[-1]))
+        ROTATIONS[offsets] = tuple(table)
+        return ROTATIONS[offsets]
+
+
+def offset_cells(offsets, center):
+    """
+    Return cells at given offsets from center.
+    """
+    return [(center[0] + row, center[1] + col) for row, col in offsets]
+
+
 def random_rotate(cells, center):
     """
     Return randomly rotated cells.
     """
-    num_rotate = random.randrange(4)
-    for _ in range(num_rotate):
-        cells = rotate_cells(cells, center)
-    return cells
+    table = rotation_table(cells, center)
+    return offset_cells(table[random.randrange(4)], center)
+
+
+class Color(object):
+    """
+    RGB color with its canvas strings formatted once. Colors are
+    interned by rgb_color, so equal colors are the same object.
+    """
+    __slots__ = ('rgb', 'solid', 'translucent', 'guarded')
+
+    def __init__(self, red, green, blue):
+        """
+        Initialize a color and its solid and translucent variants.
+        """
+        self.rgb = red, green, blue
+        self.solid = 'rgba(%d,%d,%d,1)' % self.rgb
+        self.translucent = 'rgba(%d,%d,%d,.618)' % self.rgb
+        self.guarded = self
+
+    def __str__(self):
+        """
+        Return the solid canvas string.
+        """
+        return self.solid
+
+    def get_rgb(self):
+        """
+        Return red, green and blue components.
+        """
+        return self.rgb
+
+    def get_solid(self):
+        """
+        Return the opaque canvas string.
+        """
+        return self.solid
+
+    def get_translucent(self):
+        """
+        Return the canvas string of a hovering color.
+        """
+        return self.translucent
+
+    def get_guarded(self):
+        """
+        Return the color to use when guarded, by default itself.
+        """
+        return self.guarded
+
+    def set_guarded(self, color):
+        """
+        Set the color to use when guarded.
+        """
+        self.guarded = color
+
+
+def rgb_color(red, green, blue, guarded=None):
+    """
+    Return the interned color of given components, optionally
+    setting its guarded color.
+    """
+    try:
+        color = COLORS[red, green, blue]
+    except KeyError:
+        color = Color(red, green, blue)
+        COLORS[red, green, blue] = color
+    if guarded is not None:
+        color.set_guarded(guarded)
+    return color
 
 
 def random_color():
     """
-    Return a random color pair.
+    Return a random light color.
     """
     mix_color = (255, 255, 255)
     r = (random.randrange(256) + mix_color[0]) / 2
     g = (random.randrange(256) + mix_color[1]) / 2
     b = (random.randrange(256) + mix_color[2]) / 2
-    return ('rgba(%d, %d, %d, %f)' % (r, g, b, 1),
-            'rgba(%d, %d, %d, %f)' % (r, g, b, .94))
+    return rgb_color(r, g, b)
+
+
+def translate_lines(lines, vec):
+    """
+    Return lines moved by given vector.
+    """
+    return [tuple(add(point, vec) for point in line) for line in lines]
 
 
-def cell_cell_seam(cell1, cell2, cell_size):
+def shape_corner(cells):
     """
-    Return the seam line between two cells.
+    Return the upper left corner of cells, and their shape: sorted
+    offsets from that corner. Equal shapes are the same tuple.
     """
-    row1, col1 = cell1
-    row2, col2 = cell2
-    if row1 == row2 and abs(col1 - col2) == 1:
-        pos_x = max(col1, col2) * cell_size[0]
-        return ((pos_x, (row1 + 0.97) * cell_size[1]),
-                (pos_x, (row1 + 0.03) * cell_size[1]))
-    if col1 == col2 and abs(row1 - row2) == 1:
-        pos_y = max(row1, row2) * cell_size[1]
-        return (((col1 + 0.97) * cell_size[0], pos_y),
-                ((col1 + 0.03) * cell_size[0], pos_y))
+    if not cells:
+        return (0, 0), ()
+    corner = (min(row for row, _ in cells),
+              min(col for _, col in cells))
+    shape = tuple(sorted(sub(cell, corner) for cell in cells))
+    return corner, SHAPES.setdefault(shape, shape)
 
 
-def cell_cells_seams(cell, cells, size):
+def shape_symmetries(shape):
     """
-    Return the seam lines between one cell and other cells.
+    Return the shapes of given shape under the 8 rotations and
+    reflections of the square.
     """
-    cells = set(cells)
-    return [cell_cell_seam(cell, neighbor, size)
-            for neighbor in cell_4_neighbor(cell)
-            if neighbor in cells]
+    ans = []
+    for flip in (1, -1):
+        for turn in range(4):
+            cells = [(row, col * flip) for row, col in shape]
+            for _ in range(turn):
+                cells = [rotate_offset(cell) for cell in cells]
+            ans.append(shape_corner(cells)[1])
+    return ans
 
 
-def cells_seams(cells, cell_size):
+def shape_key(cells, symmetric=False):
+    """
+    Return a key equal for all cells of the same shape up to
+    translation, and also up to rotation and reflection if symmetric.
+    """
+    shape = shape_corner(cells)[1]
+    if not symmetric:
+        return shape
+    try:
+        return SYMMETRIC_SHAPES[shape]
+    except KeyError:
+        shapes = shape_symmetries(shape)
+        key = min(shapes)
+        for other in shapes:
+            SYMMETRIC_SHAPES[other] = key
+        return key
+
+
+def cells_outline(cells):
     """
-    Return all seam lines between any two cells.
+    Return the boundary loops of given cells as lists of grid corner
+    points (col, row), clockwise around cells and counterclockwise
+    around holes, with only the points where a loop turns.
     """
-    # base case
-    if len(cells) < 2:
+    cell_set = set(cells)
+    edges = {}
+    for row, col in cell_set:
+        if (row - 1, col) not in cell_set:
+            edges.setdefault((col, row), []).append((col + 1, row))
+        if (row, col + 1) not in cell_set:
+            edges.setdefault((col + 1, row), []).append((col + 1, row + 1))
+        if (row + 1, col) not in cell_set:
+            edges.setdefault((col + 1, row + 1), []).append((col, row + 1))
+        if (row, col - 1) not in cell_set:
+            edges.setdefault((col, row + 1), []).append((col, row))
+
+    loops = []
+    while edges:
+        point = min(edges)
+        direction = None
+        loop = []
+        while point in edges:
+            ends = edges[point]
+            end = ends[0]
+            if len(ends) > 1 and direction is not None:
+                # where cells touch at a corner, turn right to keep
+                # each loop from crossing itself
+                right = (point[0] - direction[1], point[1] + direction[0])
+                if right in ends:
+                    end = right
+            ends.remove(end)
+            if not ends:
+                del edges[point]
+            new_direction = (end[0] - point[0], end[1] - point[1])
+            if new_direction != direction:
+                loop.append(point)
+            direction = new_direction
+            point = end
+        loops.append(loop)
+    return loops
+
+
+def shape_outline(cells, cell_size):
+    """
+    Return the boundary loops of given cells on canvas. Outlines are
+    cached per shape relative to its upper left cell, then translated.
+    """
+    if not cells:
         return []
+    corner, shape = shape_corner(cells)
+    try:
+        loops = OUTLINES[shape, cell_size]
+    except KeyError:
+        loops = [tuple((pos_x * cell_size[0], pos_y * cell_size[1])
+                       for pos_x, pos_y in loop)
+                 for loop in cells_outline(shape)]
+        OUTLINES[shape, cell_size] = loops
+    return translate_lines(loops, cell_corner(corner[0], corner[1],
+                                              cell_size))
+
+
+def outline_polygon(loops):
+    """
+    Return one polygon joining all loops by bridges from the start of
+    the first loop. Bridges are walked both ways and enclose nothing,
+    so holes stay empty when filled.
+    """
+    polygon = list(loops[0])
+    for loop in loops[1:]:
+        polygon.append(loops[0][0])
+        polygon.extend(loop)
+        polygon.append(loop[0])
+    return polygon
 
-    # recursion
-    cell = cells[0]
-    cells = cells[1:]
-    return (cell_cells_seams(cell, cells, cell_size)
-            + cells_seams(cells, cell_size))
+
+def draw_outline(canvas, loops, line_width, line_color, fill_color):
+    """
+    Draw boundary loops filled, with a single call if there is only
+    one loop. Otherwise fill them as one polygon and stroke each loop.
+    """
+    if len(loops) == 1:
+        canvas.draw_polygon(loops[0], line_width, line_color, fill_color)
+        return
+    canvas.draw_polygon(outline_polygon(loops), 1, fill_color, fill_color)
+    for loop in loops:
+        canvas.draw_polyline(list(loop) + [loop[0]], line_width, line_color)
+
+
+def find_root(parents, cell):
+    """
+    Return the root of a cell in a union-find forest, halving the
+    path on the way up.
+    """
+    while parents[cell] != cell:
+        parents[cell] = parents[parents[cell]]
+        cell = parents[cell]
+    return cell
+
+
+def connected_cell_groups(cell_groups):
+    """
+    Return all connected cells of each group of cells, found with
+    one union-find pass over every group. Groups must not overlap.
+    """
+    group_of = {}
+    for idx, cells in enumerate(cell_groups):
+        for cell in cells:
+            group_of[cell] = idx
+    parents = dict((cell, cell) for cell in group_of)
+
+    for cell, idx in group_of.items():
+        for offset in (DOWN, RIGHT):
+            neighbor = add(cell, offset)
+            if group_of.get(neighbor) == idx:
+                root = find_root(parents, cell)
+                neighbor_root = find_root(parents, neighbor)
+                if root != neighbor_root:
+                    parents[root] = neighbor_root
+
+    ans = [{} for _ in cell_groups]
+    for cell, idx in group_of.items():
+        root = find_root(parents, cell)
+        ans[idx].setdefault(root, set()).add(cell)
+    return [list(components.values()) for components in ans]
 
 
 def connected_cells(cells):
     """
     Return all connected cells.
     """
-    ans = []
-    copy = set(cells)
-
-    # BFS
-    while copy:
-        start = copy.pop()
-        connected = set([start])
-        stack = [start]
-        while stack:
-            cell = stack.pop(0)
-            for neighbor in cell_4_neighbor(cell):
-                if neighbor in copy:
-                    connected.add(neighbor)
-                    stack.append(neighbor)
-                    copy.remove(neighbor)
-        ans.append(connected)
+    return connected_cell_groups([cells])[0]
 
-    return ans
+
+def connected_tile_groups(tile_groups):
+    """
+    Return all connected tiles of each group of tiles.
+    """
+    tile_map = dict((tile.get_cell(), tile)
+                    for tiles in tile_groups for tile in tiles)
+    cell_groups = [[tile.get_cell() for tile in tiles]
+                   for tiles in tile_groups]
+    return [[[tile_map[cell] for cell in cells] for cells in components]
+            for components in connected_cell_groups(cell_groups)]
 
 
 def connected_tiles(tiles):
     """
     Return all connected tiles.
     """
-    tile_map = dict((tile.get_cell(), tile) for tile in tiles)
-    return [[tile_map[cell] for cell in cells]
-            for cells in connected_cells(tile_map.keys())]
+    return connected_tile_groups([tiles])[0]
 
 
-class Rect:
+class Rect(object):
     """
-    Rectangle with color.
+    Rectangle with color. The corner polygon is computed lazily,
+    only when drawn or asked for.
     """
+    __slots__ = ('center', 'size', 'color', 'border_width',
+                 'border_color', 'rect', 'animation', 'spatial_index')
+
     def __init__(self, center, size, color):
         """
         Initialize a rectangle with color.
@@ -264,8 +505,9 @@ class Rect:
 
         self.border_width = 2
         self.border_color = 'Black'
-        self.rect = center_rect(center, size)
+        self.rect = None
         self.animation = None
+        self.spatial_index = None
 
     def get_center(self):
         """
@@ -278,7 +520,9 @@ class Rect:
         Change the center position.
         """
         self.center = center
-        self.rect = center_rect(center, self.size)
+        self.rect = None
+        if self.spatial_index is not None:
+            self.spatial_index.update(self)
 
     def get_size(self):
         """
@@ -291,7 +535,9 @@ class Rect:
         Change size.
         """
         self.size = size
-        self.set_center(self.center)
+        self.rect = None
+        if self.spatial_index is not None:
+            self.spatial_index.update(self)
 
     def get_color(self):
         """
@@ -321,6 +567,8 @@ class Rect:
         """
         Return rectangle.
         """
+        if self.rect is None:
+            self.rect = center_rect(self.center, self.size)
         return tuple(self.rect)
 
     def set_rect(self, rect):
@@ -341,6 +589,12 @@ class Rect:
         """
         self.animation = animation
 
+    def set_spatial_index(self, spatial_index):
+        """
+        Set the spatial index to notify when position or size changes.
+        """
+        self.spatial_index = spatial_index
+
     def has_pos(self, pos):
         """
         Return true if given position is inside rectangle.
@@ -357,9 +611,9 @@ class Rect:
 
     def update(self):
         """
-        Update by self's animation.
+        Update by self's animation, unless a scheduler updates it.
         """
-        if self.animation:
+        if self.animation and self.animation.get_scheduler() is None:
             self.animation.update(self)
 
     def draw(self, canvas):
@@ -367,7 +621,7 @@ class Rect:
         Draw rectangle on canvas.
         """
         self.update()
-        canvas.draw_polygon(self.rect,
+        canvas.draw_polygon(self.get_rect(),
                             self.border_width,
                             self.border_color,
                             self.color)
@@ -428,6 +682,8 @@ class Tile(Rect):
     """
     Tile in grid.
     """
+    __slots__ = ('row', 'col')
+
     def __init__(self, row, col, cell_size, tile_size, color):
         """
         Initialize a tile at the center of a cell.
@@ -465,3 +721,335 @@ class Tile(Rect):
             self.set_center(center)
         self.row = row
         self.col = col
+
+
+class SpatialIndex(object):
+    """
+    Uniform bucket grid of rectangles for fast point queries.
+    Registered rectangles update their buckets when they move
+    or resize.
+    """
+    def __init__(self, bucket_size):
+        """
+        Initialize an empty index with given bucket size.
+        """
+        self.bucket_size = bucket_size
+        self.buckets = {}
+        self.rect_buckets = {}
+
+    def __len__(self):
+        """
+        Return the number of rectangles.
+        """
+        return len(self.rect_buckets)
+
+    def bucket(self, pos):
+        """
+        Return the bucket key of a position.
+        """
+        return (int(math.floor(float(pos[0]) / self.bucket_size[0])),
+                int(math.floor(float(pos[1]) / self.bucket_size[1])))
+
+    def rect_keys(self, rect):
+        """
+        Return the bucket keys a rectangle overlaps.
+        """
+        center = rect.get_center()
+        half = div(rect.get_size(), 2.0)
+        left, top = self.bucket(sub(center, half))
+        right, bottom = self.bucket(add(center, half))
+        return tuple((key_x, key_y)
+                     for key_x in range(left, right + 1)
+                     for key_y in range(top, bottom + 1))
+
+    def add(self, rect):
+        """
+        Register a rectangle.
+        """
+        keys = self.rect_keys(rect)
+        self.rect_buckets[rect] = keys
+        for key in keys:
+            self.buckets.setdefault(key, set()).add(rect)
+        rect.set_spatial_index(self)
+
+    def remove(self, rect):
+        """
+        Unregister a rectangle.
+        """
+        for key in self.rect_buckets.pop(rect):
+            bucket = self.buckets[key]
+            bucket.discard(rect)
+            if not bucket:
+                del self.buckets[key]
+        rect.set_spatial_index(None)
+
+    def update(self, rect):
+        """
+        Move a rectangle to the buckets it now overlaps.
+        """
+        keys = self.rect_keys(rect)
+        if keys != self.rect_buckets[rect]:
+            self.remove(rect)
+            self.add(rect)
+
+    def clear(self):
+        """
+        Unregister all rectangles.
+        """
+        for rect in list(self.rect_buckets):
+            self.remove(rect)
+
+    def query(self, pos):
+        """
+        Return rectangles that contain given position.
+        """
+        return [rect for rect in self.buckets.get(self.bucket(pos), ())
+                if rect.has_pos(pos)]
+
+
+def grow_array(array, capacity):
+    """
+    Return a copy of an array with more rows, padded with zeros.
+    """
+    ans = numpy.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    ans[:len(array)] = array
+    return ans
+
+
+def cell_centers(cells, cell_size):
+    """
+    Return the (x, y) centers of an (n, 2) array of (row, col) cells.
+    """
+    cells = numpy.asarray(cells, dtype=float).reshape(-1, 2)
+    return (cells[:, ::-1] + 0.5) * cell_size
+
+
+def pos_cells(positions, cell_size):
+    """
+    Return the (row, col) cells of an (n, 2) array of (x, y) positions.
+    """
+    positions = numpy.asarray(positions, dtype=float).reshape(-1, 2)
+    return (positions // cell_size)[:, ::-1].astype(int)
+
+
+class TileBatch(object):
+    """
+    Geometry of many tiles kept in parallel NumPy arrays, so that
+    polygons, hit tests and cell positions of all tiles are computed
+    in one call. Requires NumPy.
+    """
+    def __init__(self, capacity=64):
+        """
+        Initialize an empty batch.
+        """
+        if numpy is None:
+            raise ImportError('TileBatch requires NumPy')
+        self.num_tile = 0
+        self.centers = numpy.zeros((capacity, 2))
+        self.sizes = numpy.zeros((capacity, 2))
+        self.cells = numpy.zeros((capacity, 2), dtype=int)
+        self.colors = []
+        self.polygons = None
+
+    def __len__(self):
+        """
+        Return the number of tiles.
+        """
+        return self.num_tile
+
+    def add_tile(self, row, col, cell_size, tile_size, color):
+        """
+        Add a tile at the center of a cell, and return its view.
+        """
+        if self.num_tile == len(self.centers):
+            capacity = 2 * len(self.centers)
+            self.centers = grow_array(self.centers, capacity)
+            self.sizes = grow_array(self.sizes, capacity)
+            self.cells = grow_array(self.cells, capacity)
+        index = self.num_tile
+        self.num_tile += 1
+        self.cells[index] = row, col
+        self.centers[index] = cell_center(row, col, cell_size)
+        self.sizes[index] = tile_size
+        self.colors.append(color)
+        self.polygons = None
+        return TileView(self, index)
+
+    def get_centers(self):
+        """
+        Return an (n, 2) view of tile centers.
+        """
+        return self.centers[:self.num_tile]
+
+    def get_sizes(self):
+        """
+        Return an (n, 2) view of tile sizes.
+        """
+        return self.sizes[:self.num_tile]
+
+    def get_cells(self):
+        """
+        Return an (n, 2) view of tile cells.
+        """
+        return self.cells[:self.num_tile]
+
+    def get_colors(self):
+        """
+        Return tile colors.
+        """
+        return list(self.colors)
+
+    def set_centers(self, indices, centers):
+        """
+        Change centers of tiles at given indices.
+        """
+        self.centers[indices] = centers
+        self.polygons = None
+
+    def set_sizes(self, indices, sizes):
+        """
+        Change sizes of tiles at given indices.
+        """
+        self.sizes[indices] = sizes
+        self.polygons = None
+
+    def set_cells(self, indices, cells, cell_size=None):
+        """
+        Change cells of tiles at given indices, and move them to
+        the cell centers if cell size is given.
+        """
+        cells = numpy.asarray(cells).reshape(-1, 2)
+        self.cells[indices] = cells
+        if cell_size:
+            self.set_centers(indices, cell_centers(cells, cell_size))
+
+    def get_polygons(self):
+        """
+        Return the corner polygons of all tiles as an (n, 4, 2) array,
+        clockwise from upper left.
+        """
+        if self.polygons is None:
+            half = self.get_sizes() / 2.0
+            near = self.get_centers() - half
+            far = self.get_centers() + half
+            polygons = numpy.empty((self.num_tile, 4, 2))
+            polygons[:, 0] = near
+            polygons[:, 1, 0] = far[:, 0]
+            polygons[:, 1, 1] = near[:, 1]
+            polygons[:, 2] = far
+            polygons[:, 3, 0] = near[:, 0]
+            polygons[:, 3, 1] = far[:, 1]
+            self.polygons = polygons
+        return self.polygons
+
+    def hit_test(self, pos):
+        """
+        Return indices of tiles that contain given position.
+        """
+        diff = numpy.abs(self.get_centers() - pos)
+        inside = (diff <= self.get_sizes() / 2.0).all(axis=1)
+        return numpy.flatnonzero(inside)
+
+    def draw(self, canvas, border_width=2, border_color='Black'):
+        """
+        Draw all tiles on canvas.
+        """
+        for polygon, color in zip(self.get_polygons().tolist(),
+                                  self.colors):
+            canvas.draw_polygon(polygon, border_width, border_color, color)
+
+
+class TileView(Tile):
+    """
+    Tile whose center, size, color and cell are stored in a TileBatch.
+    """
+    __slots__ = ('batch', 'index')
+
+    def __init__(self, batch, index):
+        """
+        Initialize a view of a tile in batch.
+        """
+        self.batch = batch
+        self.index = index
+        self.border_width = 2
+        self.border_color = 'Black'
+        self.rect = None
+        self.animation = None
+        self.spatial_index = None
+
+    def get_view_center(self):
+        """
+        Return center from batch.
+        """
+        return tuple(self.batch.centers[self.index].tolist())
+
+    def set_view_center(self, center):
+        """
+        Change center in batch.
+        """
+        self.batch.centers[self.index] = center
+        self.batch.polygons = None
+
+    def get_view_size(self):
+        """
+        Return size from batch.
+        """
+        return tuple(self.batch.sizes[self.index].tolist())
+
+    def set_view_size(self, size):
+        """
+        Change size in batch.
+        """
+        self.batch.sizes[self.index] = size
+        self.batch.polygons = None
+
+    def get_view_color(self):
+        """
+        Return color from batch.
+        """
+        return self.batch.colors[self.index]
+
+    def set_view_color(self, color):
+        """
+        Change color in batch.
+        """
+        self.batch.colors[self.index] = color
+
+    def get_view_row(self):
+        """
+        Return row from batch.
+        """
+        return int(self.batch.cells[self.index, 0])
+
+    def set_view_row(self, row):
+        """
+        Change row in batch.
+        """
+        self.batch.cells[self.index, 0] = row
+
+    def get_view_col(self):
+        """
+        Return column from batch.
+        """
+        return int(self.batch.cells[self.index, 1])
+
+    def set_view_col(self, col):
+        """
+        Change column in batch.
+        """
+        self.batch.cells[self.index, 1] = col
+
+    center = property(get_view_center, set_view_center)
+    size = property(get_view_size, set_view_size)
+    color = property(get_view_color, set_view_color)
+    row = property(get_view_row, set_view_row)
+    col = property(get_view_col, set_view_col)
+
+    def get_rect(self):
+        """
+        Override to read the polygon from batch unless one was set.
+        """
+        if self.rect is not None:
+            return tuple(self.rect)
+        polygon = self.batch.get_polygons()[self.index]
+        return tuple(tuple(point) for point in polygon.tolist())
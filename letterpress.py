@@ -69,9 +69,12 @@ CONSONANTS_DISTRIBUTION = [
 ]
 TILE_SIZE = 80, 80
 CELL_SIZE = 80, 80
-TILE_COLOR = 'rgba(246,246,246,1)', 'rgba(249,249,249,1)'
-OWNER_COLOR = 'rgba(119,200,245,1)', 'rgba(247,153,141,1)'
-GUARD_COLOR = 'rgba(0,162,255,1)', 'rgba(255,67,46,1)'
+TILE_COLOR = (kq2tile.rgb_color(246, 246, 246),
+              kq2tile.rgb_color(249, 249, 249))
+GUARD_COLOR = (kq2tile.rgb_color(0, 162, 255),
+               kq2tile.rgb_color(255, 67, 46))
+OWNER_COLOR = (kq2tile.rgb_color(119, 200, 245, GUARD_COLOR[0]),
+               kq2tile.rgb_color(247, 153, 141, GUARD_COLOR[1]))
 FONT_SIZE = 23
 FONT_FACE = 'serif'
 FONT_COLOR = 'BLACK'
@@ -193,6 +196,7 @@ class Tile(kq2tile.Tile, kq2tile.TextRect):
 
         self.set_border_color('rgba(0,0,0,.02)')
 
+        self.tile_color = None
         self.hovering = False
         self.selected = False
         self.guarded = False
@@ -224,16 +228,21 @@ class Tile(kq2tile.Tile, kq2tile.TextRect):
         Hover tile and set its color to transparent.
         """
         self.hovering = True
-        color = self.get_color().replace(',1)', ',.618)')
-        self.set_color(color)
+        self.set_color(self.tile_color.get_translucent())
 
     def land(self):
         """
         Land tile and set its color back to solid.
         """
         self.hovering = False
-        color = self.get_color().replace(',.618)', ',1)')
-        self.set_color(color)
+        self.set_color(self.tile_color.get_solid())
+
+    def set_tile_color(self, color):
+        """
+        Set tile's color object and draw with its solid variant.
+        """
+        self.tile_color = color
+        self.set_color(color.get_solid())
 
     def is_selected(self):
         """
@@ -264,14 +273,14 @@ class Tile(kq2tile.Tile, kq2tile.TextRect):
         """
         Guard tile, change its color.
         """
-        self.set_color(GUARD_COLOR[self.owner])
+        self.set_tile_color(OWNER_COLOR[self.owner].get_guarded())
         self.guarded = True
 
     def un_guard(self):
         """
         Remove tile's guard, set it color back.
         """
-        self.set_color(OWNER_COLOR[self.owner])
+        self.set_tile_color(OWNER_COLOR[self.owner])
         self.guarded = False
 
     def get_owner(self):
@@ -303,6 +312,7 @@ class Game(kq2grid.Grid, kq2gui.Game):
         self.scores = [0, 0]
         self.drag_tile = None
         self.picked_tiles = []
+        self.picked_index = kq2tile.SpatialIndex(CELL_SIZE)
         self.played_words = set()
         self.words = load_words(WORDS_FILE)
 
@@ -312,6 +322,7 @@ class Game(kq2grid.Grid, kq2gui.Game):
                 FONT_SIZE, FONT_FACE, FONT_COLOR
             )
             self.set_tile(row, col, tile)
+        self.set_hash_key(Tile.get_owner)
 
     def reset(self):
         """
@@ -323,6 +334,7 @@ class Game(kq2grid.Grid, kq2gui.Game):
         self.scores = [0, 0]
         self.drag_tile = None
         self.picked_tiles = []
+        self.picked_index.clear()
         self.played_words = set()
 
         num_tile = len(self)
@@ -333,10 +345,11 @@ class Game(kq2grid.Grid, kq2gui.Game):
             tile = self.get_tile(row, col)
             tile.set_text(letters.pop())
             tile.reset()
+            self.refresh_tile(row, col)
 
             # guarantee adjacent tiles have different colors
             idx = (row ^ col) % 2
-            tile.set_color(TILE_COLOR[idx])
+            tile.set_tile_color(TILE_COLOR[idx])
 
         self.get_gui().update_msg('')
         self.get_gui().update_scores(self.scores)
@@ -360,11 +373,10 @@ class Game(kq2grid.Grid, kq2gui.Game):
                 return tile
         else:
             # position is in picked tiles
-            for tile in self.picked_tiles:
-                if tile is self.drag_tile:
-                    continue
-                if tile.has_pos(pos):
-                    return tile
+            tiles = [tile for tile in self.picked_index.query(pos)
+                     if tile is not self.drag_tile]
+            if tiles:
+                return min(tiles, key=self.picked_tiles.index)
 
             # no tile at this position
             return None
@@ -426,6 +438,7 @@ class Game(kq2grid.Grid, kq2gui.Game):
         """
         tile.select()
         self.picked_tiles.append(tile)
+        self.picked_index.add(tile)
 
         if tile.is_guarded() or tile.get_owner() is self.player:
             return
@@ -442,6 +455,7 @@ class Game(kq2grid.Grid, kq2gui.Game):
         """
         tile.un_select()
         self.picked_tiles.remove(tile)
+        self.picked_index.remove(tile)
 
         if tile.is_guarded() or tile.get_owner() is self.player:
             return
@@ -514,11 +528,9 @@ class Game(kq2grid.Grid, kq2gui.Game):
         """
         Return the neighbors of given tile in grid.
         """
-        ans = set()
-        for row, col in kq2tile.cell_4_neighbor(tile.get_cell()):
-            if self.is_valid(row, col):
-                ans.add(self.get_tile(row, col))
-        return ans
+        index = self.get_index(tile.get_row(), tile.get_col())
+        return set(self.get_index_tile(neighbor)
+                   for neighbor in self.get_index_neighbors(index))
 
     def change_owner(self, tile):
         """
@@ -528,6 +540,7 @@ class Game(kq2grid.Grid, kq2gui.Game):
         if tile.is_guarded() or tile.get_owner() is self.player:
             return False
         tile.set_owner(self.player)
+        self.refresh_tile(*tile.get_cell())
         return True
 
     def change_guard(self, tile):
@@ -554,10 +567,11 @@ class Game(kq2grid.Grid, kq2gui.Game):
 
         if not self.over:
             canvas.draw_circle(dot_pos[self.player], 1, 1,
-                               GUARD_COLOR[self.player])
+                               GUARD_COLOR[self.player].get_solid())
         for idx in range(2):
             canvas.draw_text(str(self.scores[idx]), scores_pos[idx],
-                             FONT_SIZE, GUARD_COLOR[idx], FONT_FACE)
+                             FONT_SIZE, GUARD_COLOR[idx].get_solid(),
+                             FONT_FACE)
 
     def draw(self, canvas):
         """
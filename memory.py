@@ -15,6 +15,7 @@ ANGLE_ANIMATION = [
     0.81, 0.91, 1.0, 1.08, 1.15,
     1.14, 1.12, 1.09, 1.05, 1
 ]
+CLOCK = kq2animation.Clock()
 
 
 def random_colors(num_color):
@@ -23,7 +24,7 @@ def random_colors(num_color):
     """
     ans = []
     while len(ans) < num_color:
-        color, _ = kq2tile.random_color()
+        color = kq2tile.random_color().get_solid()
         ans.append(color)
         ans.append(color)
     random.shuffle(ans)
@@ -40,11 +41,13 @@ def valid_click(pos, tile):
             and tile.has_pos(pos))
 
 
-def new_tile(tile, tile_color):
+def new_tile(tile, tile_color, scheduler):
     """
-    Add animation to new tile.
+    Add animation to new tile, updated by given scheduler.
     """
     animation = kq2animation.Flipping(0, tile_color, tile_color)
+    animation.set_clock(CLOCK)
+    animation.set_scheduler(scheduler, tile)
     tile.set_animation(animation)
 
 
@@ -78,6 +81,7 @@ class Game(kq2grid.Grid, kq2gui.Game):
 
         self.score = 0
         self.exposed_tiles = []
+        self.scheduler = kq2animation.new_scheduler()
 
         tile_color = 'White'
         for row, col in self:
@@ -85,7 +89,7 @@ class Game(kq2grid.Grid, kq2gui.Game):
                                 TILE_SIZE, tile_color)
             tile.set_border_color(tile_color)
             self.set_tile(row, col, tile)
-            new_tile(tile, tile_color)
+            new_tile(tile, tile_color, self.scheduler)
 
     def reset(self):
         """
@@ -136,8 +140,9 @@ class Game(kq2grid.Grid, kq2gui.Game):
 
     def draw(self, canvas):
         """
-        Draw all tiles on canvas.
+        Draw all tiles on canvas, after updating moving ones.
         """
+        self.scheduler.tick()
         for row, col in self:
             self.get_tile(row, col).draw(canvas)
 
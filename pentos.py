@@ -37,6 +37,8 @@ TETROMINO = {
     'T': (((0, 0), (1, 0), (2, 0), (1, 1)), (1, 0))
 }
 TILE_SIZE = 30, 30
+BORDER_WIDTH = 2
+BORDER_COLOR = 'Black'
 START_ROWS = 6
 START_GRID = (2, 4)
 
@@ -56,31 +58,48 @@ def new_polyomino(mino_map, mino_key=''):
     Return a random new polyomino.
     """
     cells, center = random_shape(mino_map, mino_key)
-    cells = kq2tile.random_rotate(cells, center)
-    color, seam_color = kq2tile.random_color()
+    rotations = kq2tile.rotation_table(cells, center)
+    orientation = random.randrange(4)
+    color = kq2tile.random_color().get_solid()
 
-    offset = kq2tile.sub(START_GRID, center)
     tiles = []
-    for cell in cells:
-        row, col = kq2tile.add(cell, offset)
+    for row, col in kq2tile.offset_cells(rotations[orientation], START_GRID):
         tile = kq2tile.Tile(row, col, TILE_SIZE, TILE_SIZE, color)
         tiles.append(tile)
 
-    return Polyomino(tiles, START_GRID, seam_color)
+    mino = Polyomino(tiles, START_GRID, color)
+    mino.set_rotations(rotations, orientation)
+    return mino
+
+
+def split_polyominoes(minos, rows):
+    """
+    Return the remaining polyominoes after removing given rows from
+    all given polyominoes, splitting them all in one pass.
+    """
+    minos = list(minos)
+    tile_groups = kq2tile.connected_tile_groups(
+        [mino.remaining_tiles(rows) for mino in minos])
+    return [Polyomino(tiles, mino.get_center(), mino.color)
+            for mino, groups in zip(minos, tile_groups)
+            for tiles in groups]
 
 
 class Polyomino:
     """
     Polyomino class encapsulates a group of connected tiles.
     """
-    def __init__(self, tiles, center, seam_color):
+    def __init__(self, tiles, center, color):
         """
         Initialize a polyomino.
         """
         self.tiles = tiles
         self.center = center
-        self.seam_color = seam_color
-        self.seams = self.new_seams()
+        self.color = color
+        self.outline = self.new_outline()
+        self.footprint = kq2grid.cells_mask(self.get_cells())
+        self.rotations = None
+        self.orientation = 0
 
     def __len__(self):
         """
@@ -100,11 +119,44 @@ class Polyomino:
         """
         return [tile.get_cell() for tile in self.tiles]
 
-    def new_seams(self):
+    def get_indices(self, stride):
+        """
+        Return occupied cells encoded as integers.
+        """
+        return [tile.get_row() * stride + tile.get_col()
+                for tile in self.tiles]
+
+    def get_rows(self):
+        """
+        Return occupied rows, from footprint.
+        """
+        (row, _), masks = self.footprint
+        return [row + row_offset for row_offset, _ in masks]
+
+    def set_rotations(self, rotations, orientation):
+        """
+        Set the rotation table of tiles and the current orientation.
+        """
+        self.rotations = rotations
+        self.orientation = orientation
+
+    def get_shape(self, symmetric=False):
+        """
+        Return the shape key of tiles, see kq2tile.shape_key.
+        """
+        return kq2tile.shape_key(self.get_cells(), symmetric)
+
+    def get_footprint(self):
+        """
+        Return occupied cells as a grid footprint (corner, row masks).
+        """
+        return self.footprint
+
+    def new_outline(self):
         """
-        Return all seams between any two tiles.
+        Return the boundary loops around all tiles.
         """
-        return kq2tile.cells_seams(self.get_cells(), TILE_SIZE)
+        return kq2tile.shape_outline(self.get_cells(), TILE_SIZE)
 
     def move_cells(self, offset):
         """
@@ -117,35 +169,58 @@ class Polyomino:
         """
         Return the occupied cells after rotate.
         """
-        return [kq2tile.rotate_cell(tile.get_cell(), self.center)
-                for tile in self.tiles]
+        if self.rotations is None:
+            self.set_rotations(
+                kq2tile.rotation_table(self.get_cells(), self.center), 0)
+        offsets = self.rotations[(self.orientation + 1) % 4]
+        return kq2tile.offset_cells(offsets, self.center)
+
+    def rotate(self, cells, offset):
+        """
+        Update position to given rotated cells.
+        """
+        self.set_cells(cells, offset)
+        self.outline = self.new_outline()
+        self.footprint = kq2grid.cells_mask(cells)
+        self.orientation = (self.orientation + 1) % 4
+
+    def remaining_tiles(self, rows):
+        """
+        Return tiles that are not in given rows.
+        """
+        return [tile for tile in self.tiles
+                if tile.get_row() not in rows]
 
     def remove_rows(self, rows):
         """
         Return the remaining polyominoes after removing given rows.
         """
-        remaining_tiles = [tile for tile in self.tiles
-                           if tile.get_row() not in rows]
-        return [Polyomino(tiles, self.center, self.seam_color)
-                for tiles in kq2tile.connected_tiles(remaining_tiles)]
+        return split_polyominoes([self], rows)
 
-    def update(self, cells, offset):
+    def set_cells(self, cells, offset):
         """
-        Update position to given cells.
+        Move tiles to given cells, and rotation center by offset.
         """
         for tile, (row, col) in zip(self.tiles, cells):
             tile.set_cell(row, col, TILE_SIZE)
         self.center = kq2tile.add(self.center, offset)
-        self.seams = self.new_seams()
+
+    def update(self, cells, offset):
+        """
+        Update position to given cells, moved by offset.
+        """
+        self.set_cells(cells, offset)
+        vec = kq2tile.cell_corner(offset[0], offset[1], TILE_SIZE)
+        self.outline = kq2tile.translate_lines(self.outline, vec)
+        corner, masks = self.footprint
+        self.footprint = kq2tile.add(corner, offset), masks
 
     def draw(self, canvas):
         """
-        Draw tiles and their seams on canvas.
+        Draw tiles as one outlined shape on canvas.
         """
-        for tile in self.tiles:
-            tile.draw(canvas)
-        for seam in self.seams:
-            canvas.draw_polyline(seam, 2, self.seam_color)
+        kq2tile.draw_outline(canvas, self.outline, BORDER_WIDTH,
+                             BORDER_COLOR, self.color)
 
 
 class Game(kq2grid.Grid, kq2gui.Game):
@@ -157,6 +232,7 @@ class Game(kq2grid.Grid, kq2gui.Game):
         Initialize a polyominoes game.
         """
         kq2grid.Grid.__init__(self, rows + START_ROWS, cols)
+        self.set_hash_key(kq2grid.occupied_key)
         kq2gui.Game.__init__(self)
 
         self.mino = None
@@ -164,7 +240,6 @@ class Game(kq2grid.Grid, kq2gui.Game):
         self.moving_minos = set()
 
         self.score = 0
-        self.top_row = 0
         self.full_rows = set()
 
         self.routine = []
@@ -197,7 +272,6 @@ class Game(kq2grid.Grid, kq2gui.Game):
 
         self.score = 0
         self.get_gui().update_score(self.score)
-        self.top_row = self.get_rows()
         self.full_rows = set()
 
         self.new_mino()
@@ -247,38 +321,31 @@ class Game(kq2grid.Grid, kq2gui.Game):
         for row in rows:
             self.empty_row(row)
 
-    def vacant(self, cells):
+    def can_move(self, mino, offset):
         """
-        Return true if all given cells are empty.
+        Return true if given polyomino's cells are empty after move.
         """
-        for row, col in cells:
-            if not self.is_empty(row, col):
-                return False
-        return True
-
-    def is_full(self, row):
-        """
-        Return true if given row is full.
-        """
-        for row, col in self.get_row(row):
-            if self.is_empty(row, col):
-                return False
-        return True
+        (row, col), masks = mino.get_footprint()
+        return self.vacant_mask(masks, row + offset[0], col + offset[1])
 
     def is_over(self):
         """
         Return true if game is over (maximum rows reached).
         """
-        return self.top_row < START_ROWS
+        return self.highest_nonempty_row() < START_ROWS
 
     def minos_in_row(self, row):
         """
         Return all polyominoes in given row.
         """
         ans = set()
-        for row, col in self.get_row(row):
-            if not self.is_empty(row, col):
+        mask = self.get_row_mask(row)
+        col = 0
+        while mask:
+            if mask & 1:
                 ans.add(self.get_tile(row, col))
+            mask >>= 1
+            col += 1
         return ans
 
     def minos_in_rows(self, rows):
@@ -292,9 +359,8 @@ class Game(kq2grid.Grid, kq2gui.Game):
         """
         Try move given polyomino, return true if moved.
         """
-        cells = mino.move_cells(offset)
-        if self.vacant(cells):
-            mino.update(cells, offset)
+        if self.can_move(mino, offset):
+            mino.update(mino.move_cells(offset), offset)
             return True
         return False
 
@@ -317,8 +383,7 @@ class Game(kq2grid.Grid, kq2gui.Game):
         """
         removed = False
         for mino in set(minos):
-            cells = mino.move_cells(offset)
-            if not self.vacant(cells):
+            if not self.can_move(mino, offset):
                 minos.remove(mino)
                 self.add_stable_mino(mino)
                 removed = True
@@ -332,11 +397,10 @@ class Game(kq2grid.Grid, kq2gui.Game):
         """
         self.stable_minos.add(mino)
 
-        for row, col in mino.get_cells():
-            self.set_tile(row, col, mino)
-            if self.top_row > row:
-                self.top_row = row
-            if self.is_full(row):
+        for index in mino.get_indices(self.get_cols()):
+            self.set_index_tile(index, mino)
+        for row in mino.get_rows():
+            if self.is_row_full(row):
                 self.full_rows.add(row)
 
     def remove_full_rows(self):
@@ -347,13 +411,12 @@ class Game(kq2grid.Grid, kq2gui.Game):
         if self.full_rows:
             self.break_minos(self.full_rows)
             bottom_row = max(self.full_rows)
-            moving_rows = range(self.top_row, bottom_row)
+            moving_rows = range(self.highest_nonempty_row(), bottom_row)
             for mino in self.minos_in_rows(moving_rows):
                 self.stable_minos.remove(mino)
                 self.moving_minos.add(mino)
 
             self.empty_rows(moving_rows)
-            self.top_row = bottom_row + 1
             self.score += len(self.full_rows)
             self.get_gui().update_score(self.score)
             self.full_rows = set()
@@ -363,12 +426,11 @@ class Game(kq2grid.Grid, kq2gui.Game):
         Remove all full rows from affected polyominoes.
         Add remaining polyominoes to moving set.
         """
-        for mino in self.minos_in_rows(rows):
-            self.pop_tiles(mino.get_cells())
+        minos = self.minos_in_rows(rows)
+        for mino in minos:
+            self.pop_index_tiles(mino.get_indices(self.get_cols()))
             self.stable_minos.remove(mino)
-            new_minos = mino.remove_rows(rows)
-            for new_mino in new_minos:
-                self.moving_minos.add(new_mino)
+        self.moving_minos.update(split_polyominoes(minos, rows))
 
     def rotate(self):
         """
@@ -376,8 +438,9 @@ class Game(kq2grid.Grid, kq2gui.Game):
         """
         mino = self.mino
         cells = mino.rotate_cells()
-        if self.vacant(cells):
-            mino.update(cells, (0, 0))
+        corner, masks = kq2grid.cells_mask(cells)
+        if self.vacant_mask(masks, *corner):
+            mino.rotate(cells, (0, 0))
             return True
 
         # try move left or right then rotate
@@ -385,10 +448,11 @@ class Game(kq2grid.Grid, kq2gui.Game):
         for idx in range(1, half_mino):
             for direction in [kq2tile.LEFT, kq2tile.RIGHT]:
                 offset = kq2tile.mul(direction, idx)
-                test_cells = [kq2tile.add(cell, offset)
-                              for cell in cells]
-                if self.vacant(test_cells):
-                    mino.update(test_cells, offset)
+                row, col = kq2tile.add(corner, offset)
+                if self.vacant_mask(masks, row, col):
+                    test_cells = [kq2tile.add(cell, offset)
+                                  for cell in cells]
+                    mino.rotate(test_cells, offset)
                     return True
 
         return False